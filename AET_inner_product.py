@@ -0,0 +1,492 @@
+#!/usr/bin/env python3
+"""
+Noise-weighted inner products and optimal SNRs of A/E/T time series.
+
+For real series a, b sampled every dt seconds and a one-sided noise PSD S(f),
+
+    (a|b) = 4 Re int_0^inf a~*(f) b~(f) / S(f) df,    SNR = sqrt(sum_channels (h|h)),
+
+evaluated on the rfft grid with a~ = dt * rfft(a). The frequency grid and the
+noise weights 4 dt / (n S(f)) (the PSD interpolated onto the grid, zero
+outside (f_min, f_max]) are cached per (n, dt, channel, PSD, band), so
+repeated calls for series of the same length only pay for the FFT; numpy's
+pocketfft keeps its own plan cache per length. All series stacked along the
+leading axes of one array go through a single rfft call.
+
+Series too long to transform in one piece (or read from disk at once) are
+streamed: each channel is whitened by convolving it with a truncated
+whitening filter, in overlapping segments (overlap-save), and the whitened
+segments are multiplied and summed. This is the linear rather than circular
+inner product, and agrees with the direct one for series that decay to zero
+at both ends, such as glitches, up to the truncation of the filter. That
+error is measured, not assumed: ``filter_response_error`` compares |H(f)|^2
+of the truncated filter with the target weights on the segment grid, which
+is the relative error of (a|a) for a signal with a flat whitened spectrum.
+By default the filter length is the shortest power of two that brings it
+within ``filter_tolerance`` (0.1%) for every channel; a given length that
+does not is an error, so the streamed and direct SNRs of one file cannot
+differ silently. The error falls as 1/filter_length and comes from the band
+edges, so signals with their power piled up at f_min or f_max see more of
+it than the estimate.
+
+PSDs: "SciRDv1" (the LISA science-requirements noise, TDI generation 2 by
+default, as used for the glitch SNRs of the paper), or a table file
+(.npy or text) with columns f, S_A, S_E, S_T, interpolated in log-log.
+
+By default SNRs are over the A and E channels, as the stored "SciRDv1 PSD
+{A_2,E_2}" SNRs, in the band 1e-4 Hz < f <= 0.025 Hz. Outside it the
+weights 1/S(f) are not physical: the T PSD goes to zero as f -> 0, and the
+TDI2 PSDs have transfer-function zeros at k c/(4L) = k * 0.02998 Hz, below
+the Nyquist frequency of dt = 5 s, where a single bin can dominate the sum
+and the result depends on the series length. Pass channels, f_min and f_max
+explicitly (f_max=None for Nyquist) to go outside it.
+
+The glitch background files ``BG_{idx}_AET.h5`` are read as datasets "A", "E"
+and "T" with the sample spacing in a "dt" attribute or dataset (or ``--dt``).
+
+Example:
+
+    from AET_inner_product import optimal_SNR
+    SNR = optimal_SNR(np.stack([A, E]), dt=5.0)               # channels on the leading axis
+    SNRs = optimal_SNR(AE_batch, dt=5.0)                       # (n_series, 2, n) -> (n_series,)
+
+Usage:
+    python AET_inner_product.py --max-glitch-snr 90 8 --jobs 8
+    python AET_inner_product.py --max-glitch-snr inf --psd my_psd.txt --f-min 1e-5 --output SNRs_inf.npy
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+CHANNELS = ("A", "E", "T")
+DEFAULT_CHANNELS = ("A", "E")
+DEFAULT_F_MIN = 1e-4  # Hz
+DEFAULT_F_MAX = 0.025  # Hz, below the first TDI2 transfer-function zero at c/(4L)
+C_LIGHT = 299792458.0
+LISA_ARM_LENGTH = 2.5e9  # m
+DEFAULT_SEGMENT_LENGTH = 2**20
+DEFAULT_FILTER_TOLERANCE = 1e-3
+MIN_FILTER_LENGTH = 2**12
+
+
+def SciRDv1_PSD(f: np.ndarray, channel: str, tdi_generation: int = 2) -> np.ndarray:
+    """One-sided SciRDv1 PSD of A, E or T in fractional frequency, 1/Hz."""
+    f = np.asarray(f, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        #Test-mass acceleration and optical metrology noise, converted to fractional frequency
+        S_acc = (3e-15)**2*(1 + (4e-4/f)**2)*(1 + (f/8e-3)**4)/(2*np.pi*f*C_LIGHT)**2
+        S_oms = (15e-12)**2*(1 + (2e-3/f)**4)*(2*np.pi*f/C_LIGHT)**2
+        x = 2*np.pi*f*LISA_ARM_LENGTH/C_LIGHT
+        if channel in ("A", "E"):
+            S = 8*np.sin(x)**2*(2*S_acc*(3 + 2*np.cos(x) + np.cos(2*x)) + S_oms*(2 + np.cos(x)))
+        elif channel == "T":
+            S = 16*S_oms*(1 - np.cos(x))*np.sin(x)**2 + 128*S_acc*np.sin(x)**2*np.sin(x/2)**4
+        else:
+            raise ValueError(f"unknown channel {channel!r}, expected one of {CHANNELS}")
+        if tdi_generation == 2:
+            S = S*4*np.sin(2*x)**2
+        elif tdi_generation != 1:
+            raise ValueError(f"TDI generation must be 1 or 2, got {tdi_generation}")
+    return S
+
+
+@lru_cache(maxsize=None)
+def _PSD_table(path: str) -> np.ndarray:
+    table = np.load(path) if path.endswith(".npy") else np.loadtxt(path)
+    if table.ndim != 2 or table.shape[1] != 1 + len(CHANNELS):
+        raise ValueError(f"{path}: expected columns f, S_A, S_E, S_T, got shape {table.shape}")
+    return table[np.argsort(table[:, 0])]
+
+
+def PSD(f: np.ndarray, channel: str, psd: str = "SciRDv1") -> np.ndarray:
+    """PSD of ``channel`` on ``f``; +inf where a table does not cover f, so those bins get no weight."""
+    if psd == "SciRDv1":
+        return SciRDv1_PSD(f, channel)
+    table = _PSD_table(psd)
+    f = np.asarray(f, dtype=np.float64)
+    S = np.full(f.shape, np.inf)
+    inside = (f >= table[0, 0]) & (f <= table[-1, 0]) & (f > 0)
+    log_S = np.log(table[:, 1 + CHANNELS.index(channel)])
+    S[inside] = np.exp(np.interp(np.log(f[inside]), np.log(table[:, 0]), log_S))
+    return S
+
+
+@lru_cache(maxsize=None)
+def frequency_grid(n: int, dt: float) -> np.ndarray:
+    freqs = np.fft.rfftfreq(n, dt)
+    freqs.setflags(write=False)
+    return freqs
+
+
+@lru_cache(maxsize=256)
+def noise_weights(
+    n: int,
+    dt: float,
+    channel: str,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+) -> np.ndarray:
+    """w such that (a|b) = sum(w * Re(conj(rfft(a)) rfft(b))) for series of length n."""
+    freqs = frequency_grid(n, dt)
+    S = PSD(freqs, channel, psd)
+    band = (freqs > max(f_min, 0.0)) & np.isfinite(S) & (S > 0)
+    if f_max is not None:
+        band &= freqs <= f_max
+    weights = np.zeros(len(freqs))
+    weights[band] = 4*dt/(n*S[band])
+    if n % 2 == 0:
+        #The Nyquist bin is its own mirror image, so it counts once rather than twice
+        weights[-1] /= 2
+    weights.setflags(write=False)
+    return weights
+
+
+def _channel_weights(n: int, dt: float, channels: Sequence[str], psd: str, f_min: float, f_max: Optional[float]) -> np.ndarray:
+    return np.stack([noise_weights(n, float(dt), ch, psd, f_min, f_max) for ch in channels])
+
+
+def inner_product(
+    a: np.ndarray,
+    b: np.ndarray,
+    dt: float,
+    channels: Sequence[str] = DEFAULT_CHANNELS,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+) -> np.ndarray:
+    """(a|b) summed over channels; a, b are (..., n_channels, n) and are transformed in one rfft call each."""
+    a = np.asarray(a, dtype=np.float64)
+    b = np.asarray(b, dtype=np.float64)
+    weights = _channel_weights(a.shape[-1], dt, channels, psd, f_min, f_max)
+    a_f = np.fft.rfft(a, axis=-1)
+    b_f = a_f if b is a else np.fft.rfft(b, axis=-1)
+    return np.sum(weights*(a_f.real*b_f.real + a_f.imag*b_f.imag), axis=(-2, -1))
+
+
+def optimal_SNR(
+    h: np.ndarray,
+    dt: float,
+    channels: Sequence[str] = DEFAULT_CHANNELS,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+) -> np.ndarray:
+    """sqrt((h|h)) over channels for h of shape (..., n_channels, n)."""
+    h = np.asarray(h, dtype=np.float64)
+    return np.sqrt(inner_product(h, h, dt, channels, psd, f_min, f_max))
+
+
+def _tukey(n: int, alpha: float = 0.1) -> np.ndarray:
+    window = np.ones(n)
+    edge = int(alpha*n/2)
+    if edge > 0:
+        window[:edge] = 0.5*(1 - np.cos(np.pi*np.arange(edge)/edge))
+        window[n - edge:] = window[:edge][::-1]
+    return window
+
+
+@lru_cache(maxsize=64)
+def whitening_filter_response(
+    segment_length: int,
+    filter_length: int,
+    dt: float,
+    channel: str,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+) -> np.ndarray:
+    """rfft, on the segment grid, of the zero-phase whitening filter truncated to ``filter_length`` taps.
+
+    The filter h has |H(f)|^2 = 2 dt / S(f), so that sum_t (h*a)(h*b) = (a|b) for the
+    full linear convolutions. It is centred (delayed by filter_length//2 samples),
+    which does not change the sum.
+    """
+    #Design the filter on its own grid, then window it to limit the truncation ripple
+    target = _filter_target(filter_length, dt, channel, psd, f_min, f_max)
+    taps = np.roll(np.fft.irfft(np.sqrt(target), filter_length), filter_length//2)*_tukey(filter_length)
+    response = np.fft.rfft(taps, segment_length)
+    response.setflags(write=False)
+    return response
+
+
+def _filter_target(n: int, dt: float, channel: str, psd: str, f_min: float, f_max: Optional[float]) -> np.ndarray:
+    """|H(f)|^2 of the exact whitening filter on the rfft grid of n samples."""
+    target = noise_weights(n, dt, channel, psd, f_min, f_max)*n/2
+    if n % 2 == 0:
+        target = target.copy()
+        target[-1] *= 2
+    return target
+
+
+def filter_response_error(
+    segment_length: int,
+    filter_length: int,
+    dt: float,
+    channel: str,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+) -> float:
+    """sum |(|H|^2 - target)| / sum target on the segment grid, for the filter truncated to ``filter_length`` taps."""
+    target = _filter_target(segment_length, float(dt), channel, psd, f_min, f_max)
+    response = whitening_filter_response(segment_length, filter_length, float(dt), channel, psd, f_min, f_max)
+    return float(np.sum(np.abs(np.abs(response)**2 - target))/np.sum(target))
+
+
+def choose_filter_length(
+    segment_length: int,
+    dt: float,
+    channels: Sequence[str] = DEFAULT_CHANNELS,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+    tolerance: float = DEFAULT_FILTER_TOLERANCE,
+) -> int:
+    """Shortest power-of-two filter, at most segment_length/2, whose response error is within ``tolerance`` in every channel."""
+    filter_length = MIN_FILTER_LENGTH
+    while filter_length <= segment_length//2:
+        if all(filter_response_error(segment_length, filter_length, dt, ch, psd, f_min, f_max) <= tolerance for ch in channels):
+            return filter_length
+        filter_length *= 2
+    raise ValueError(
+        f"no whitening filter of up to {segment_length//2} taps reproduces the {psd} weights in "
+        f"({f_min}, {f_max if f_max is not None else 'Nyquist'}] Hz to {tolerance}; use a longer segment_length or a narrower band"
+    )
+
+
+def streamed_inner_product(
+    a: Sequence[np.ndarray],
+    b: Sequence[np.ndarray],
+    dt: float,
+    channels: Sequence[str] = DEFAULT_CHANNELS,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+    segment_length: int = DEFAULT_SEGMENT_LENGTH,
+    filter_length: Optional[int] = None,
+    filter_tolerance: float = DEFAULT_FILTER_TOLERANCE,
+) -> float:
+    """(a|b) over channels for long series, whitened by overlap-save in overlapping segments.
+
+    ``a`` and ``b`` are per-channel 1-d array-likes that support slicing (arrays,
+    memmaps or h5py datasets); only one segment of each is in memory at a time.
+    ``b`` may be ``a``. Without ``filter_length`` the shortest filter within
+    ``filter_tolerance`` is used; a given one must be within it too.
+    """
+    dt = float(dt)
+    if filter_length is None:
+        filter_length = choose_filter_length(segment_length, dt, channels, psd, f_min, f_max, filter_tolerance)
+    if segment_length <= filter_length:
+        raise ValueError(f"segment_length ({segment_length}) must exceed filter_length ({filter_length})")
+    for ch in channels:
+        error = filter_response_error(segment_length, filter_length, dt, ch, psd, f_min, f_max)
+        if error > filter_tolerance:
+            raise ValueError(
+                f"a {filter_length}-tap whitening filter reproduces the {ch} weights only to {error:.3g} "
+                f"(tolerance {filter_tolerance}); use a longer filter_length or leave it unset"
+            )
+    n = len(a[0])
+    overlap = filter_length - 1
+    step = segment_length - overlap
+    response = np.stack([
+        whitening_filter_response(segment_length, filter_length, dt, ch, psd, f_min, f_max) for ch in channels
+    ])
+
+    def segment(series, start):
+        #Samples start - overlap .. start + step, zero outside the series
+        out = np.zeros((len(channels), segment_length))
+        lo, hi = max(start - overlap, 0), min(start + step, n)
+        for k, x in enumerate(series):
+            out[k, lo - (start - overlap):hi - (start - overlap)] = x[lo:hi]
+        return out
+
+    total = 0.0
+    #The whitened series is n + filter_length - 1 samples long (full linear convolution)
+    for start in range(0, n + overlap, step):
+        a_seg = segment(a, start)
+        a_white = np.fft.irfft(np.fft.rfft(a_seg, axis=-1)*response, segment_length, axis=-1)[:, overlap:]
+        if b is a:
+            b_white = a_white
+        else:
+            b_seg = segment(b, start)
+            b_white = np.fft.irfft(np.fft.rfft(b_seg, axis=-1)*response, segment_length, axis=-1)[:, overlap:]
+        total += float(np.sum(a_white*b_white))
+    return total
+
+
+class BackgroundSNR(NamedTuple):
+    bg_idx: int
+    stored_SNR: float
+    SNR: float
+
+
+def _read_dt(f, default: Optional[float]) -> float:
+    if "dt" in f.attrs:
+        return float(f.attrs["dt"])
+    if "dt" in f:
+        return float(f["dt"][()])
+    if default is None:
+        raise ValueError(f"{f.filename}: no 'dt' attribute or dataset; pass dt")
+    return default
+
+
+def background_SNR(
+    path: str | Path,
+    dt: Optional[float] = None,
+    channels: Sequence[str] = DEFAULT_CHANNELS,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+    segment_length: Optional[int] = None,
+    filter_length: Optional[int] = None,
+    filter_tolerance: float = DEFAULT_FILTER_TOLERANCE,
+) -> BackgroundSNR:
+    """Recomputed optimal SNR of one ``BG_{idx}_AET.h5`` file, next to the SNR stored in it.
+
+    Series longer than ``segment_length`` are streamed from the file.
+    """
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        dt = _read_dt(f, dt)
+        stored = float(f["SNR"][()]) if "SNR" in f else np.nan
+        n = f[channels[0]].shape[0]
+        if segment_length is not None and n > segment_length:
+            series = [f[ch] for ch in channels]
+            SNR = np.sqrt(streamed_inner_product(
+                series, series, dt, channels, psd, f_min, f_max, segment_length, filter_length, filter_tolerance
+            ))
+        else:
+            SNR = float(optimal_SNR(np.stack([f[ch][()] for ch in channels]), dt, channels, psd, f_min, f_max))
+    bg_idx = int(Path(path).name.split("_")[1])
+    return BackgroundSNR(bg_idx, stored, SNR)
+
+
+def _background_SNRs(
+    paths: Sequence[str],
+    dt: Optional[float],
+    channels: Sequence[str],
+    psd: str,
+    f_min: float,
+    f_max: Optional[float],
+    segment_length: Optional[int],
+    filter_length: Optional[int],
+    filter_tolerance: float,
+    max_batch_bytes: int,
+) -> list[BackgroundSNR]:
+    """background_SNR of several files, stacking equal-length, equal-dt series into one optimal_SNR call per batch."""
+    import h5py
+
+    rows = []
+    batches = {}  # (n, dt) -> (bg_idx, stored_SNR, series) waiting for one batched call
+
+    def flush(key):
+        n, batch_dt = key
+        batch = batches.pop(key)
+        SNRs = optimal_SNR(np.stack([series for _, _, series in batch]), batch_dt, channels, psd, f_min, f_max)
+        rows.extend(BackgroundSNR(bg_idx, stored, float(SNR)) for (bg_idx, stored, _), SNR in zip(batch, SNRs))
+
+    for path in paths:
+        with h5py.File(path, "r") as f:
+            n = f[channels[0]].shape[0]
+            if segment_length is not None and n > segment_length:
+                streamed = True
+            else:
+                streamed = False
+                key = (n, _read_dt(f, dt))
+                stored = float(f["SNR"][()]) if "SNR" in f else np.nan
+                series = np.stack([f[ch][()] for ch in channels])
+        if streamed:
+            rows.append(background_SNR(path, dt, channels, psd, f_min, f_max, segment_length, filter_length, filter_tolerance))
+            continue
+        batches.setdefault(key, []).append((int(Path(path).name.split("_")[1]), stored, series))
+        if len(batches[key])*series.nbytes >= max_batch_bytes:
+            flush(key)
+    for key in list(batches):
+        flush(key)
+    return rows
+
+
+def recompute_bg_SNRs(
+    max_glitch_SNR: float,
+    dt: Optional[float] = None,
+    channels: Sequence[str] = DEFAULT_CHANNELS,
+    psd: str = "SciRDv1",
+    f_min: float = DEFAULT_F_MIN,
+    f_max: Optional[float] = DEFAULT_F_MAX,
+    segment_length: Optional[int] = None,
+    filter_length: Optional[int] = None,
+    filter_tolerance: float = DEFAULT_FILTER_TOLERANCE,
+    jobs: int = 1,
+    max_batch_bytes: int = 256 * 2**20,
+) -> np.ndarray:
+    """Recomputed optimal SNRs of every background of one max glitch SNR cut, sorted by bg_idx.
+
+    Structured array with fields (bg_idx, stored_SNR, SNR). The files are split
+    into one contiguous chunk per process; within a chunk, backgrounds of the
+    same length and dt are stacked, up to ``max_batch_bytes``, and go through
+    one rfft call.
+    """
+    from bg_snr_index import AET_dir
+
+    files = [str(path) for path in sorted(AET_dir(max_glitch_SNR).glob("BG_*_AET.h5"))]
+    args = (dt, tuple(channels), psd, f_min, f_max, segment_length, filter_length, filter_tolerance, max_batch_bytes)
+    if jobs > 1 and len(files) > 1:
+        per_job = -(-len(files) // jobs)
+        chunks = [files[lo:lo + per_job] for lo in range(0, len(files), per_job)]
+        with ProcessPoolExecutor(max_workers=len(chunks)) as pool:
+            rows = [row for chunk in pool.map(_background_SNRs, chunks, *[[a]*len(chunks) for a in args]) for row in chunk]
+    else:
+        rows = _background_SNRs(files, *args)
+    out = np.array(rows, dtype=[("bg_idx", "i8"), ("stored_SNR", "f8"), ("SNR", "f8")])
+    return out[np.argsort(out["bg_idx"])]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--max-glitch-snr", nargs="+", type=float, default=[np.inf, 400.0, 90.0, 8.0])
+    p.add_argument("--psd", default="SciRDv1", help="'SciRDv1' or a table file with columns f, S_A, S_E, S_T")
+    p.add_argument("--dt", type=float, help="Sample spacing [s] for files without a 'dt' attribute or dataset")
+    p.add_argument("--channels", nargs="+", choices=CHANNELS, default=list(DEFAULT_CHANNELS), help="TDI channels (default: A E)")
+    p.add_argument("--f-min", type=float, default=DEFAULT_F_MIN, help=f"Lower frequency limit [Hz] (default: {DEFAULT_F_MIN})")
+    p.add_argument("--f-max", type=float, default=DEFAULT_F_MAX, help=f"Upper frequency limit [Hz], inf for Nyquist (default: {DEFAULT_F_MAX})")
+    p.add_argument("--segment-length", type=int, help="Stream series longer than this many samples")
+    p.add_argument("--filter-length", type=int, help="Whitening filter taps when streaming (default: the shortest within --filter-tolerance)")
+    p.add_argument("--filter-tolerance", type=float, default=DEFAULT_FILTER_TOLERANCE, help=f"Largest relative error of the streamed (h|h) (default: {DEFAULT_FILTER_TOLERANCE})")
+    p.add_argument("--jobs", type=int, default=os.cpu_count(), help="Worker processes (default: all cores)")
+    p.add_argument("--output", type=Path, help="Save the (bg_idx, stored_SNR, SNR) table as .npy (one cut only)")
+    args = p.parse_args()
+    if args.output is not None and len(args.max_glitch_snr) != 1:
+        raise SystemExit("--output needs exactly one --max-glitch-snr")
+
+    for SNR in args.max_glitch_snr:
+        t0 = time.perf_counter()
+        table = recompute_bg_SNRs(
+            SNR, args.dt, args.channels, args.psd, args.f_min, args.f_max, args.segment_length, args.filter_length,
+            args.filter_tolerance, args.jobs
+        )
+        elapsed = time.perf_counter() - t0
+        if not len(table):
+            print(f"max glitch SNR {SNR}: no backgrounds")
+            continue
+        rel = np.abs(table["SNR"]/table["stored_SNR"] - 1)
+        print(
+            f"max glitch SNR {SNR}: {len(table)} backgrounds in {elapsed:.2f} s, optimal SNR median "
+            f"{np.median(table['SNR']):.4g}, max relative change from stored {np.nanmax(rel):.3g}"
+        )
+        if args.output is not None:
+            np.save(args.output, table)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Shared loaders for the inputs of the figure scripts: the EMRI Fisher matrices
+and the per-mitigation-level glitch error arrays.
+
+Everything is cached per process under a (EMRI label, max glitch SNR) style
+key, so running several figures in one interpreter (see run_figures.py) reads
+each input file only once. Cache entries remember the mtime and size of the
+files they were built from and are dropped when those files change on disk.
+Error arrays are memory-mapped read-only by default; every returned array is
+read-only because it is shared between callers. When the consolidated store
+built by EMRI_error_store.py exists, memory-mapped error arrays are served as
+views into it, except for entries whose source .npy has changed since the
+store was built.
+
+Example:
+
+    from EMRI_data import load_EMRI_dataset
+    data = load_EMRI_dataset("Prograde_EMRI", 90.0)
+    R = np.abs(data.delta_theta_arr/data.SD_ii)
+"""
+
+from __future__ import annotations
+
+import os
+from typing import Any, Callable, NamedTuple, Optional
+
+import numpy as np
+
+from EMRI_error_store import ErrorStore, store_key, store_paths
+from fisher_cache import NoiseModel, load_noise_model as _load_noise_model, read_fisher
+
+fisher_dir = "data_files/EMRI_fisher/"
+EMRI_errors_dir = "data_files/EMRI_errors/"
+
+
+class EMRIDataset(NamedTuple):
+    label: str
+    max_glitch_SNR: float
+    delta_theta_arr: np.ndarray
+    R_arr: Optional[np.ndarray]
+    noise_covariance: np.ndarray
+    noise_cholesky: np.ndarray
+    SD_ii: np.ndarray
+
+
+# key -> (file stamps the value was built from, value)
+_cache: dict[tuple, tuple[tuple, Any]] = {}
+
+
+def _stamp(path: str) -> tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _cached(key: tuple, paths: list[str], loader: Callable[[], Any]) -> Any:
+    stamps = tuple(_stamp(p) for p in paths)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == stamps:
+        return hit[1]
+    value = loader()
+    _cache[key] = (stamps, value)
+    return value
+
+
+def _read_only(arr: np.ndarray) -> np.ndarray:
+    arr.flags.writeable = False
+    return arr
+
+
+def clear_cache() -> None:
+    _cache.clear()
+
+
+def fisher_file(label: str) -> str:
+    return fisher_dir + f"Fisher_{label}.h5"
+
+
+def errors_dir(SNR: float) -> str:
+    return EMRI_errors_dir + f"max_glitch_SNR_{float(SNR)}/"
+
+
+def delta_theta_arr_file(label: str, SNR: float) -> str:
+    return errors_dir(SNR) + f"{label}_delta_theta_arr.npy"
+
+
+def R_arr_file(label: str, SNR: float) -> str:
+    return errors_dir(SNR) + f"{label}_R_arr.npy"
+
+
+def load_fisher(label: str) -> np.ndarray:
+    """Fisher matrix stored in ``Fisher_{label}.h5``."""
+    path = fisher_file(label)
+
+    return _cached(("fisher", label), [path], lambda: _read_only(read_fisher(path)))
+
+
+def load_noise_model(label: str) -> NoiseModel:
+    """Noise covariance, its Cholesky factor and ``SD_ii`` from the persistent cache in fisher_cache."""
+    path = fisher_file(label)
+
+    def load():
+        model = _load_noise_model(path)
+        for arr in (model.noise_covariance, model.noise_cholesky, model.fisher_cholesky, model.fisher_scale, model.SD_ii):
+            _read_only(arr)
+        return model
+
+    return _cached(("noise_model", label), [path], load)
+
+
+def load_noise_covariance(label: str) -> tuple[np.ndarray, np.ndarray]:
+    """FM-derived noise-induced covariance and its per-parameter SDs (``SD_ii``)."""
+    model = load_noise_model(label)
+    return model.noise_covariance, model.SD_ii
+
+
+def load_error_store() -> Optional[ErrorStore]:
+    """The consolidated error store of EMRI_errors_dir, or None if it has not been built."""
+    paths = [str(p) for p in store_paths(EMRI_errors_dir)]
+    if not all(os.path.exists(p) for p in paths):
+        return None
+    return _cached(("error_store", EMRI_errors_dir), paths, lambda: ErrorStore(EMRI_errors_dir))
+
+
+def _load_npy(path: str, mmap_mode: Optional[str]) -> np.ndarray:
+    arr = np.load(path, mmap_mode=mmap_mode)
+    return arr if mmap_mode == "r" else _read_only(arr)
+
+
+def _load_error_arr(quantity: str, path: str, label: str, SNR: float, mmap_mode: Optional[str]) -> np.ndarray:
+    if mmap_mode == "r":
+        store = load_error_store()
+        key = store_key(label, SNR, quantity)
+        if store is not None and key in store and store.is_current(key):
+            return store[key]
+    return _cached((f"{quantity}_arr", label, float(SNR), mmap_mode), [path],
+                   lambda: _load_npy(path, mmap_mode))
+
+
+def load_delta_theta_arr(label: str, SNR: float, mmap_mode: Optional[str] = "r") -> np.ndarray:
+    """Glitch-induced biases of every glitch background for one max glitch SNR."""
+    return _load_error_arr("delta_theta", delta_theta_arr_file(label, SNR), label, SNR, mmap_mode)
+
+
+def load_R_arr(label: str, SNR: float, mmap_mode: Optional[str] = "r") -> np.ndarray:
+    """Stored R vectors (|bias|/SD) of every glitch background for one max glitch SNR."""
+    return _load_error_arr("R", R_arr_file(label, SNR), label, SNR, mmap_mode)
+
+
+def load_EMRI_dataset(label: str, SNR: float, mmap_mode: Optional[str] = "r") -> EMRIDataset:
+    """All inputs for one (EMRI label, max glitch SNR) pair; ``R_arr`` is None if not stored."""
+    model = load_noise_model(label)
+    store = load_error_store() if mmap_mode == "r" else None
+    has_R = os.path.exists(R_arr_file(label, SNR)) or (store is not None and store_key(label, SNR, "R") in store)
+    R_arr = load_R_arr(label, SNR, mmap_mode) if has_R else None
+    return EMRIDataset(
+        label=label,
+        max_glitch_SNR=SNR,
+        delta_theta_arr=load_delta_theta_arr(label, SNR, mmap_mode),
+        R_arr=R_arr,
+        noise_covariance=model.noise_covariance,
+        noise_cholesky=model.noise_cholesky,
+        SD_ii=model.SD_ii,
+    )
@@ -0,0 +1,240 @@
+#!/usr/bin/env python3
+"""
+Consolidated, memory-mappable store of the EMRI glitch error arrays.
+
+The 24 ``{label}_{delta_theta|R}_arr.npy`` files under
+``data_files/EMRI_errors/max_glitch_SNR_{SNR}/`` and, when the Fisher files
+are available, each EMRI's Fisher-derived ``SD_ii``, are packed into
+
+    data_files/EMRI_errors/EMRI_errors.bin    raw C-order arrays, 64-byte aligned
+    data_files/EMRI_errors/EMRI_errors.json   index: key -> offset, dtype, shape, source
+
+Keys are ``{label}/max_glitch_SNR_{SNR}/{delta_theta|R}`` and ``{label}/SD_ii``.
+Opening the store maps the .bin file once and hands out read-only, zero-copy
+ndarray views into it. The index also records the size and mtime of every
+source file, so readers (see EMRI_data.py) can tell when an entry is stale.
+
+Example:
+
+    from EMRI_error_store import open_error_store
+    store = open_error_store()
+    delta_theta_arr = store.delta_theta_arr("Prograde_EMRI", 90.0)
+    SD_ii = store.SD_ii("Prograde_EMRI")
+
+Usage:
+    python EMRI_error_store.py build     # (re)build from data_files/EMRI_errors
+    python EMRI_error_store.py check     # compare every entry with its source, exactly
+    python EMRI_error_store.py list
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional
+
+import numpy as np
+
+EMRI_errors_dir = "data_files/EMRI_errors/"
+fisher_dir = "data_files/EMRI_fisher/"
+STORE_NAME = "EMRI_errors"
+STORE_VERSION = 1
+ALIGNMENT = 64
+
+_ERROR_FILE_PATTERN = re.compile(r"^(.+)_(delta_theta|R)_arr\.npy$")
+
+
+class StoreSource(NamedTuple):
+    key: str
+    path: Path
+    label: str
+    max_glitch_SNR: Optional[float]  # None for SD_ii
+    quantity: str  # "delta_theta", "R" or "SD_ii"
+
+
+def store_paths(errors_dir: str | Path = EMRI_errors_dir) -> tuple[Path, Path]:
+    """(.bin, .json) paths of the store in ``errors_dir``."""
+    errors_dir = Path(errors_dir)
+    return errors_dir / f"{STORE_NAME}.bin", errors_dir / f"{STORE_NAME}.json"
+
+
+def store_key(label: str, max_glitch_SNR: Optional[float], quantity: str) -> str:
+    if quantity == "SD_ii":
+        return f"{label}/SD_ii"
+    return f"{label}/max_glitch_SNR_{float(max_glitch_SNR)}/{quantity}"
+
+
+def _stamp(path: Path) -> list[int]:
+    st = os.stat(path)
+    return [st.st_size, st.st_mtime_ns]
+
+
+def find_sources(errors_dir: str | Path = EMRI_errors_dir, fisher_dir: str | Path = fisher_dir) -> list[StoreSource]:
+    """Error arrays in ``errors_dir`` and the Fisher files of their EMRIs that exist."""
+    errors_dir, fisher_dir = Path(errors_dir), Path(fisher_dir)
+    sources = []
+    labels = set()
+    for snr_dir in sorted(errors_dir.glob("max_glitch_SNR_*")):
+        if not snr_dir.is_dir():
+            continue
+        SNR = float(snr_dir.name[len("max_glitch_SNR_"):])
+        for path in sorted(snr_dir.glob("*_arr.npy")):
+            match = _ERROR_FILE_PATTERN.match(path.name)
+            if match is None:
+                continue
+            label, quantity = match.groups()
+            labels.add(label)
+            sources.append(StoreSource(store_key(label, SNR, quantity), path, label, SNR, quantity))
+    for label in sorted(labels):
+        path = fisher_dir / f"Fisher_{label}.h5"
+        if path.exists():
+            sources.append(StoreSource(store_key(label, None, "SD_ii"), path, label, None, "SD_ii"))
+    return sources
+
+
+def read_source(source: StoreSource) -> np.ndarray:
+    """The array a store entry is built from, as the figure scripts would load it."""
+    if source.quantity == "SD_ii":
+        from fisher_cache import load_noise_model
+        return load_noise_model(source.path).SD_ii
+    return np.load(source.path, mmap_mode="r")
+
+
+def build_store(
+    errors_dir: str | Path = EMRI_errors_dir,
+    fisher_dir: str | Path = fisher_dir,
+) -> dict:
+    """Write the .bin and .json files of the store atomically; returns the index."""
+    bin_path, index_path = store_paths(errors_dir)
+    entries = {}
+    tmp_bin = bin_path.with_name(bin_path.name + f".{os.getpid()}.tmp")
+    with tmp_bin.open("wb") as f:
+        for source in find_sources(errors_dir, fisher_dir):
+            arr = np.ascontiguousarray(read_source(source))
+            pad = -f.tell() % ALIGNMENT
+            f.write(b"\0" * pad)
+            entries[source.key] = {
+                "offset": f.tell(),
+                "descr": np.lib.format.dtype_to_descr(arr.dtype),
+                "shape": list(arr.shape),
+                "source": os.path.relpath(source.path, Path(errors_dir)),
+                "source_stamp": _stamp(source.path),
+            }
+            f.write(arr.tobytes())
+        data_bytes = f.tell()
+    index = {"version": STORE_VERSION, "data_bytes": data_bytes, "arrays": entries}
+    tmp_index = index_path.with_name(index_path.name + f".{os.getpid()}.tmp")
+    tmp_index.write_text(json.dumps(index, indent=1))
+    os.replace(tmp_bin, bin_path)
+    os.replace(tmp_index, index_path)
+    return index
+
+
+class ErrorStore:
+    """Read-only, zero-copy views into a built store."""
+
+    def __init__(self, errors_dir: str | Path = EMRI_errors_dir):
+        self.errors_dir = Path(errors_dir)
+        bin_path, index_path = store_paths(errors_dir)
+        self.index = json.loads(index_path.read_text())
+        if self.index.get("version") != STORE_VERSION:
+            raise ValueError(f"{index_path}: unsupported store version {self.index.get('version')}")
+        if os.path.getsize(bin_path) != self.index["data_bytes"]:
+            raise ValueError(f"{bin_path} does not match {index_path}; rebuild the store")
+        self._data = np.memmap(bin_path, dtype=np.uint8, mode="r") if self.index["data_bytes"] else None
+
+    def __contains__(self, key: str) -> bool:
+        return key in self.index["arrays"]
+
+    def keys(self) -> list[str]:
+        return list(self.index["arrays"])
+
+    def __getitem__(self, key: str) -> np.ndarray:
+        entry = self.index["arrays"][key]
+        dtype = np.lib.format.descr_to_dtype(entry["descr"] if isinstance(entry["descr"], str)
+                                             else [tuple(field) for field in entry["descr"]])
+        shape = tuple(entry["shape"])
+        nbytes = dtype.itemsize*int(np.prod(shape))
+        offset = entry["offset"]
+        return self._data[offset:offset + nbytes].view(dtype).reshape(shape)
+
+    def source_path(self, key: str) -> Path:
+        return self.errors_dir / self.index["arrays"][key]["source"]
+
+    def is_current(self, key: str) -> bool:
+        """False when the entry's source file has changed since the store was built."""
+        path = self.source_path(key)
+        return not path.exists() or _stamp(path) == self.index["arrays"][key]["source_stamp"]
+
+    def delta_theta_arr(self, label: str, max_glitch_SNR: float) -> np.ndarray:
+        return self[store_key(label, max_glitch_SNR, "delta_theta")]
+
+    def R_arr(self, label: str, max_glitch_SNR: float) -> np.ndarray:
+        return self[store_key(label, max_glitch_SNR, "R")]
+
+    def SD_ii(self, label: str) -> np.ndarray:
+        return self[store_key(label, None, "SD_ii")]
+
+
+def open_error_store(errors_dir: str | Path = EMRI_errors_dir) -> ErrorStore:
+    return ErrorStore(errors_dir)
+
+
+def check_store(
+    errors_dir: str | Path = EMRI_errors_dir,
+    fisher_dir: str | Path = fisher_dir,
+) -> Iterator[tuple[str, Optional[str]]]:
+    """Yield (key, problem or None) for every source and every stored entry."""
+    store = open_error_store(errors_dir)
+    sources = find_sources(errors_dir, fisher_dir)
+    for source in sources:
+        if source.key not in store:
+            yield source.key, "missing from the store"
+            continue
+        expected, stored = read_source(source), store[source.key]
+        if expected.dtype != stored.dtype or expected.shape != stored.shape:
+            yield source.key, f"stored {stored.dtype}{stored.shape}, source {expected.dtype}{expected.shape}"
+        elif np.ascontiguousarray(expected).tobytes() != stored.tobytes():
+            yield source.key, "contents differ"
+        else:
+            yield source.key, None
+    for key in sorted(set(store.keys()) - {s.key for s in sources}):
+        yield key, "source no longer exists"
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("command", choices=["build", "check", "list"])
+    p.add_argument("--errors-dir", type=Path, default=Path(EMRI_errors_dir))
+    p.add_argument("--fisher-dir", type=Path, default=Path(fisher_dir))
+    args = p.parse_args()
+
+    if args.command == "build":
+        index = build_store(args.errors_dir, args.fisher_dir)
+        bin_path, _ = store_paths(args.errors_dir)
+        print(f"Wrote {len(index['arrays'])} arrays, {index['data_bytes']} bytes, to {bin_path}")
+        labels = {key.split("/")[0] for key in index["arrays"]}
+        for label in sorted(labels):
+            if store_key(label, None, "SD_ii") not in index["arrays"]:
+                print(f"  no Fisher file for {label}; SD_ii not stored")
+    elif args.command == "check":
+        bad = 0
+        for key, problem in check_store(args.errors_dir, args.fisher_dir):
+            if problem is not None:
+                bad += 1
+                print(f"MISMATCH {key}: {problem}", file=sys.stderr)
+        print("Store matches its sources exactly" if not bad else f"{bad} mismatching entr(y/ies)")
+        sys.exit(1 if bad else 0)
+    else:
+        store = open_error_store(args.errors_dir)
+        for key in store.keys():
+            arr = store[key]
+            print(f"{key:<50s} {str(arr.dtype):>8s} {arr.shape}{'' if store.is_current(key) else '  (stale)'}")
+
+
+if __name__ == "__main__":
+    main()
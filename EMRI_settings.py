@@ -1,78 +1,77 @@
 import numpy as np
 
-'''Rework: We're going to store the EMRI parameters in classes relating to each EMRI instead'''
-
-class ProgradeEMRI:
-    def __init__(self):
-        #Store a label to describe the EMRI
-        self.label = "Prograde_EMRI"
-        #Store the waveform type we're using (this does affect the EMRI's SNR)
-        self.waveform_model = "FastKerrEccentricEquatorialFlux"
-        #Store all EMRI parameters as attributes
-        self.M = 1e6
-        self.mu = 1e1
-        self.a = 0.998
-        self.p0 = 7.728
-        self.e0 = 0.730
-        self.x0 = 1.0
-        self.dist = 1.3242#2.204
-        self.qS = 0.8
-        self.phiS = 2.2
-        self.qK = 1.6
-        self.phiK = 1.2
-        self.Phi_phi0 = 2.0
-        self.Phi_theta0 = 0.0
-        self.Phi_r0 = 3.0
-        #Also the specifcy the sampling interval required for this EMRI
-        self.dt = 5.0
-    
-class StrongfieldEMRI:
-    def __init__(self):
-        #Store a label to describe the EMRI
-        self.label = "Strongfield_EMRI"
-        #Store the waveform type we're using (this does affect the EMRI's SNR)
-        self.waveform_model = "FastKerrEccentricEquatorialFlux"
-        #Store all EMRI parameters as attributes
-        self.M = 1e7
-        self.mu = 1e1
-        self.a = 0.998
-        self.p0 = 2.120
-        self.e0 = 0.425
-        self.x0 = 1.0
-        self.dist = 1.3536#3.590
-        self.qS = 0.8
-        self.phiS = 2.2
-        self.qK = 1.6
-        self.phiK = 1.2
-        self.Phi_phi0 = 2.0
-        self.Phi_theta0 = 0.0
-        self.Phi_r0 = 3.0
-        #Also the specifcy the sampling interval required for this EMRI
-        self.dt = 5.0
-
-class RetrogradeEMRI:
-    def __init__(self):
-        #Store a label to describe the EMRI
-        self.label = "Retrograde_EMRI"
-        #Store the waveform type we're using (this does affect the EMRI's SNR)
-        self.waveform_model = "FastKerrEccentricEquatorialFlux"
-        #Store all EMRI parameters as attributes
-        self.M = 1e5
-        self.mu = 1e1
-        self.a = -0.500
-        self.p0 = 26.192
-        self.e0 = 0.800
-        self.x0 = 1.0
-        self.dist = 0.38055#1.0805
-        self.qS = 0.8
-        self.phiS = 2.2
-        self.qK = 1.6
-        self.phiK = 1.2
-        self.Phi_phi0 = 2.0
-        self.Phi_theta0 = 0.0
-        self.Phi_r0 = 3.0
-        #Also the specifcy the sampling interval required for this EMRI
-        self.dt = 2.0
+from typing import NamedTuple
+
+'''Rework: We're going to store the EMRI parameters in immutable records, one per EMRI, kept in a registry by label'''
+
+class EMRI(NamedTuple):
+    #A label to describe the EMRI
+    label: str
+    #The waveform type we're using (this does affect the EMRI's SNR)
+    waveform_model: str
+    #All EMRI parameters
+    M: float
+    mu: float
+    a: float
+    p0: float
+    e0: float
+    x0: float
+    dist: float
+    qS: float
+    phiS: float
+    qK: float
+    phiK: float
+    Phi_phi0: float
+    Phi_theta0: float
+    Phi_r0: float
+    #The sampling interval required for this EMRI
+    dt: float
+
+    @property
+    def params(self):
+        """The 12 estimated params, in param_names order."""
+        return estimated_params(self)
+
+#label -> EMRI
+EMRI_registry = {}
+
+def register_EMRI(emri):
+    EMRI_registry[emri.label] = emri
+    return emri
+
+def get_EMRI(label):
+    try:
+        return EMRI_registry[label]
+    except KeyError:
+        raise KeyError(f"Unknown EMRI {label!r}; registered: {', '.join(EMRI_registry)}") from None
+
+register_EMRI(EMRI(label="Prograde_EMRI", waveform_model="FastKerrEccentricEquatorialFlux",
+                   M=1e6, mu=1e1, a=0.998, p0=7.728, e0=0.730, x0=1.0,
+                   dist=1.3242,#2.204
+                   qS=0.8, phiS=2.2, qK=1.6, phiK=1.2, Phi_phi0=2.0, Phi_theta0=0.0, Phi_r0=3.0,
+                   dt=5.0))
+
+register_EMRI(EMRI(label="Strongfield_EMRI", waveform_model="FastKerrEccentricEquatorialFlux",
+                   M=1e7, mu=1e1, a=0.998, p0=2.120, e0=0.425, x0=1.0,
+                   dist=1.3536,#3.590
+                   qS=0.8, phiS=2.2, qK=1.6, phiK=1.2, Phi_phi0=2.0, Phi_theta0=0.0, Phi_r0=3.0,
+                   dt=5.0))
+
+register_EMRI(EMRI(label="Retrograde_EMRI", waveform_model="FastKerrEccentricEquatorialFlux",
+                   M=1e5, mu=1e1, a=-0.500, p0=26.192, e0=0.800, x0=1.0,
+                   dist=0.38055,#1.0805
+                   qS=0.8, phiS=2.2, qK=1.6, phiK=1.2, Phi_phi0=2.0, Phi_theta0=0.0, Phi_r0=3.0,
+                   dt=2.0))
+
+#The old class-style constructors, e.g. fiducial_EMRI = ProgradeEMRI()
+def ProgradeEMRI():
+    return get_EMRI("Prograde_EMRI")
+
+def StrongfieldEMRI():
+    return get_EMRI("Strongfield_EMRI")
+
+def RetrogradeEMRI():
+    return get_EMRI("Retrograde_EMRI")
 
 
 #Example: M ~ O(1e7), mu ~ O(1e2), SNR 82
@@ -154,6 +153,39 @@ class RetrogradeEMRI:
 # Phi_phi0 = 2.0; Phi_theta0 = 3.0; Phi_r0 = 4.0
 """
 
+#Names, labels and units of the estimated params, in the order used by the
+#Fisher matrices and the *_delta_theta_arr.npy / *_R_arr.npy columns
+param_names = ['M','mu','a','p0','e0','dist', 'qS','phiS','qK','phiK','Phi_phi0','Phi_r0']#'Y0', 'Phi_theta0',
+param_labels = ['$M$','$\\mu$','$a$','$p_0$','$e_0$','$d_L$', '$\\theta_S$','$\\phi_S$','$\\theta_K$','$\\phi_K$','$\\Phi_{\\phi_0}$','$\\Phi_{r_0}$']#'$Y_0$', '$\\Phi_{\\theta_0}$',
+params_units = ['$M_\\odot$', '$M_\\odot$','','','','Gpc', 'rad','rad','rad','rad','rad','rad']#'', 'rad'
+
+#Many EMRIs at once (e.g. population studies) as one structured array, one row per EMRI
+EMRI_TABLE_DTYPE = np.dtype([("label", "U64"), ("waveform_model", "U64")]
+                            + [(name, "f8") for name in EMRI._fields[2:]])
+
+def EMRI_table(emris):
+    """Structured EMRI_TABLE_DTYPE array from an iterable of EMRI records."""
+    return np.array([tuple(emri) for emri in emris], dtype=EMRI_TABLE_DTYPE)
+
+def as_EMRI_table(arr):
+    """Check a structured array (e.g. np.load of a saved table) has every EMRI field and cast it to EMRI_TABLE_DTYPE."""
+    missing = [name for name in EMRI._fields if name not in (arr.dtype.names or ())]
+    if missing:
+        raise ValueError(f"EMRI table is missing field(s) {missing}")
+    table = np.empty(arr.shape, dtype=EMRI_TABLE_DTYPE)
+    for name in EMRI._fields:
+        table[name] = arr[name]
+    return table
+
+def EMRI_from_row(row):
+    return EMRI(*(row[name].item() for name in EMRI._fields))
+
+def estimated_params(emris):
+    """The 12 estimated params, in param_names order: shape (12,) for one EMRI, (n, 12) for a table."""
+    if isinstance(emris, np.ndarray):
+        return np.stack([emris[name] for name in param_names], axis=-1)
+    return np.array([getattr(emris, name) for name in param_names])
+
 # Waveform params
 delta_t = 10.0;  # Sampling interval [seconds]
 T = 2.0     # Evolution time [years]
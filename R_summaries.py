@@ -0,0 +1,163 @@
+#!/usr/bin/env python3
+"""
+Precomputed R statistics of every (EMRI, max glitch SNR) pair.
+
+With R = |delta_theta_glitches / SD_ii| for each glitch background, this
+stores
+
+    R_arr                  (N, 12)  R vectors
+    R_max, R_argmax        (N,)     parameter-wise max of each R vector, and where it is
+    argmax_counts          (12,)    bincount of R_argmax
+    R_max_sorted           (N,)     for empirical CDF lookups, see R_max_CDF()
+    mean_bias              (12,)    mean glitch bias, E(delta_theta_glitches)
+    normalised_total_bias  (12,)    |mean_bias| / SD_ii
+
+in ``data_files/EMRI_errors/max_glitch_SNR_{SNR}/cache/{label}_R_summary.npz``.
+Each summary records the size and mtime of its delta_theta array, the
+Fisher hash behind SD_ii and a hash of both. Loading compares the stamps
+first, so figures read only the few small arrays they need; the delta_theta
+array is read and hashed only when its stamp changed, and the summary is
+rebuilt only when the contents did.
+
+Example:
+
+    from R_summaries import load_R_summary
+    summary = load_R_summary("Prograde_EMRI", 90.0)
+    summary.argmax_counts
+
+Usage:
+    python R_summaries.py                                   # build or refresh all
+    python R_summaries.py --emri Prograde_EMRI --max-glitch-snr 8.0
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from EMRI_settings import EMRI_registry
+from EMRI_data import delta_theta_arr_file, errors_dir, load_delta_theta_arr, load_noise_model
+
+CACHE_SUBDIR = "cache"
+default_max_glitch_SNR = [np.inf, 400.0, 90.0, 8.0]
+default_EMRIs = list(EMRI_registry)
+
+
+class RSummary(NamedTuple):
+    R_arr: np.ndarray
+    R_max: np.ndarray
+    R_argmax: np.ndarray
+    argmax_counts: np.ndarray
+    R_max_sorted: np.ndarray
+    mean_bias: np.ndarray
+    normalised_total_bias: np.ndarray
+
+
+def compute_R_summary(delta_theta_glitches: np.ndarray, SD_ii: np.ndarray) -> RSummary:
+    R_glitches = np.abs(delta_theta_glitches/SD_ii)
+    R_max = np.max(R_glitches, axis=1)
+    R_argmax = np.argmax(R_glitches, axis=1)
+    mean_bias = np.mean(delta_theta_glitches, axis=0)
+    return RSummary(
+        R_arr=R_glitches,
+        R_max=R_max,
+        R_argmax=R_argmax,
+        argmax_counts=np.bincount(R_argmax, minlength=len(SD_ii)),
+        R_max_sorted=np.sort(R_max),
+        mean_bias=mean_bias,
+        normalised_total_bias=np.abs(mean_bias/SD_ii),
+    )
+
+
+def R_max_CDF(summary: RSummary, R: np.ndarray | float) -> np.ndarray:
+    """Empirical CDF of the parameter-wise max R, P(R_max <= R)."""
+    return np.searchsorted(summary.R_max_sorted, R, side="right")/len(summary.R_max_sorted)
+
+
+def summary_path(label: str, SNR: float) -> Path:
+    return Path(errors_dir(SNR)) / CACHE_SUBDIR / f"{label}_R_summary.npz"
+
+
+def inputs_digest(delta_theta_glitches: np.ndarray, fisher_hash: str) -> str:
+    arr = np.ascontiguousarray(delta_theta_glitches)
+    h = hashlib.sha256()
+    h.update(f"{arr.dtype.str}{arr.shape}".encode())
+    h.update(arr.tobytes())
+    h.update(fisher_hash.encode())
+    return h.hexdigest()
+
+
+def source_stamp(label: str, SNR: float) -> np.ndarray:
+    """(size, mtime_ns) of the delta_theta array file."""
+    st = os.stat(delta_theta_arr_file(label, SNR))
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def _save_summary(path: Path, summary: RSummary, stamp: np.ndarray, fisher_hash: str, digest: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        np.savez(f, source_stamp=stamp, fisher_hash=fisher_hash, inputs_digest=digest, **summary._asdict())
+    os.replace(tmp, path)
+
+
+def load_R_summary(label: str, SNR: float) -> RSummary:
+    """Stored RSummary, rebuilt first if its delta_theta array or Fisher matrix changed.
+
+    While the delta_theta file's size and mtime and the Fisher hash match the
+    stored ones, only the summary is read. Otherwise the array is read and
+    hashed, and the summary is rebuilt if its contents changed.
+    """
+    model = load_noise_model(label)
+    stamp = source_stamp(label, SNR)
+    path = summary_path(label, SNR)
+    stored = None
+    if path.exists():
+        with np.load(path, allow_pickle=False) as npz:
+            if "source_stamp" in npz.files:
+                stored = {name: npz[name] for name in npz.files}
+    if stored is not None and str(stored["fisher_hash"]) == model.fisher_hash:
+        summary = RSummary(**{name: stored[name] for name in RSummary._fields})
+        if np.array_equal(stored["source_stamp"], stamp):
+            return summary
+
+    delta_theta_glitches = load_delta_theta_arr(label, SNR)
+    digest = inputs_digest(delta_theta_glitches, model.fisher_hash)
+    if stored is None or str(stored["inputs_digest"]) != digest:
+        summary = compute_R_summary(delta_theta_glitches, model.SD_ii)
+    #Touched but unchanged inputs only refresh the stamp
+    _save_summary(path, summary, stamp, model.fisher_hash, digest)
+    return summary
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--emri", nargs="+", default=default_EMRIs, help="EMRI labels (default: every registered EMRI)")
+    p.add_argument(
+        "--max-glitch-snr",
+        nargs="+",
+        type=float,
+        default=default_max_glitch_SNR,
+        help="Max glitch SNR cuts (default: inf 400 90 8)",
+    )
+    args = p.parse_args()
+
+    for label in args.emri:
+        for SNR in args.max_glitch_snr:
+            if not os.path.exists(delta_theta_arr_file(label, SNR)):
+                print(f"{label}, max glitch SNR {SNR}: no delta_theta array, skipped")
+                continue
+            summary = load_R_summary(label, SNR)
+            print(
+                f"{label}, max glitch SNR {SNR}: {len(summary.R_max)} backgrounds, "
+                f"P(R_max <= 1) = {R_max_CDF(summary, 1.0):.3f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
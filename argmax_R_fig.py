@@ -1,7 +1,8 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from h5py import File
-from EMRI_settings import *
+from EMRI_settings import ProgradeEMRI, param_labels
+from plotting import pyplot
+from EMRI_data import delta_theta_arr_file, fisher_file
+from R_summaries import load_R_summary
 
 #Choose an EMRI
 fiducial_EMRI = ProgradeEMRI()#StrongfieldEMRI()#RetrogradeEMRI()#ProgradeEMRI()
@@ -9,57 +10,29 @@ fiducial_EMRI = ProgradeEMRI()#StrongfieldEMRI()#RetrogradeEMRI()#ProgradeEMRI()
 # Choose the levels of glitch mitigation we want to consider
 max_glitch_SNR = [np.inf, 400.0, 90.0, 8.0]
 
-#FM dir and filename
-fisher_dir= "data_files/EMRI_fisher/"
-fisher_fname= f"Fisher_{fiducial_EMRI.label}.h5"
-fisher_file= fisher_dir+fisher_fname
 
-#Load EMRI params
-M, mu, a, p0, e0, x0, dist, qS, phiS, qK, phiK, Phi_phi0, Phi_theta0, Phi_r0 = (fiducial_EMRI.M,
-                                                                                    fiducial_EMRI.mu,
-                                                                                        fiducial_EMRI.a,
-                                                                                        fiducial_EMRI.p0,
-                                                                                            fiducial_EMRI.e0,
-                                                                                            fiducial_EMRI.x0,
-                                                                                                fiducial_EMRI.dist,
-                                                                                                fiducial_EMRI.qS,
-                                                                                                    fiducial_EMRI.phiS,
-                                                                                                    fiducial_EMRI.qK,
-                                                                                                        fiducial_EMRI.phiK,
-                                                                                                        fiducial_EMRI.Phi_phi0,
-                                                                                                            fiducial_EMRI.Phi_theta0,
-                                                                                                            fiducial_EMRI.Phi_r0)
+def main(fiducial_EMRI=fiducial_EMRI, max_glitch_SNR=max_glitch_SNR, output_path=None):
+    plt = pyplot()
+    #Iterate plotting of argmax R at each SNR
+    R_argmax_counter = np.zeros(len(param_labels))
+    plt.figure()
+    for SNR in max_glitch_SNR:
+        #Counts of the arg maxes of the R vectors, precomputed in R_summaries.py
+        R_argmax_counter += load_R_summary(fiducial_EMRI.label, SNR).argmax_counts
 
-#Omitting the params that we don't estimate!
-params = [M, mu, a, p0, e0, dist, qS, phiS, qK, phiK, Phi_phi0, Phi_r0]#x0, Phi_theta0,
+    plt.pie(R_argmax_counter, labels=param_labels, radius=1.3, textprops={'fontsize': 14})
+    plt.savefig(output_path or outputs(fiducial_EMRI)[0])
+    plt.close()
 
-#Define all param names, labels and units
-param_names = ['M','mu','a','p0','e0','dist', 'qS','phiS','qK','phiK','Phi_phi0','Phi_r0']#'Y0', 'Phi_theta0',
-param_labels = ['$M$','$\\mu$','$a$','$p_0$','$e_0$','$d_L$', '$\\theta_S$','$\\phi_S$','$\\theta_K$','$\\phi_K$','$\\Phi_{\\phi_0}$','$\\Phi_{r_0}$']#'$Y_0$', '$\\Phi_{\\theta_0}$',
-params_units = ['$M_\\odot$', '$M_\\odot$','','','','Gpc', 'rad','rad','rad','rad','rad','rad']#'', 'rad'
 
-#Load FM and calculate noise-induced covariance
-with File(fisher_file,"r") as f:
-    fisher= np.array(f['Fisher'][()])
+def inputs(fiducial_EMRI=fiducial_EMRI, max_glitch_SNR=max_glitch_SNR):
+    #Files read by main(), for run_figures.py
+    return [fisher_file(fiducial_EMRI.label)] + [delta_theta_arr_file(fiducial_EMRI.label, SNR) for SNR in max_glitch_SNR]
 
-noise_covariance= np.linalg.inv(fisher)
-noise_covariance_ii= np.diag(noise_covariance)
-SD_ii = noise_covariance_ii**0.5
 
-#Iterate plotting of argmax R at each SNR
-R_argmax_counter = np.zeros_like(SD_ii)
-plt.figure()
-for SNR in max_glitch_SNR:
-    #Load EMRI biases
-    EMRI_biases_dir = f"/fred/oz303/aboumerd/EMRI_Glitches/data_files/EMRI_biases/max_glitch_SNR_{SNR}/"
-    delta_theta_arr_file= EMRI_biases_dir + f"{fiducial_EMRI.label}_delta_theta_arr.npy"
-    delta_theta_glitches= np.load(delta_theta_arr_file)
-    #Calculate R vectors
-    R_glitches = np.abs(delta_theta_glitches/SD_ii)
-    #Plot a bar chart of the arg maxes
-    R_argmax= np.argmax(R_glitches, axis=1)
-    R_argmax_counter += np.bincount(R_argmax)
+def outputs(fiducial_EMRI=fiducial_EMRI):
+    return [f"{fiducial_EMRI.label}_argmax_R.pdf"]
 
-plt.pie(R_argmax_counter, labels=param_labels, radius=1.3, textprops={'fontsize': 14})
-plt.savefig(f"{fiducial_EMRI.label}_argmax_R.pdf")
-plt.close()
\ No newline at end of file
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+"""
+Benchmark the import (start-up) time of each entry point.
+
+Every entry point is imported in a fresh interpreter under
+``python -X importtime``, best of ``--repeat`` runs. For each one this prints
+the total import time and the heaviest of its direct imports, and
+records both in a JSON file. The raw ``-X importtime`` logs can also be kept.
+
+Scripts that do their work at import time (plot_*.py) are not included.
+
+Usage:
+    python benchmark_startup.py
+    python benchmark_startup.py --repeat 5 --top 8 --output startup_importtime.json --raw-dir importtime_logs
+    python benchmark_startup.py glitch_biases_fig run_figures
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import subprocess
+import sys
+import time
+from pathlib import Path
+from typing import NamedTuple
+
+ROOT = Path(__file__).resolve().parent
+
+entry_points = [
+    "run_figures",
+    "sweep_figures",
+    "R_summaries",
+    "fm_accuracy_batch",
+    "chain_stats",
+    "bg_snr_index",
+    "EMRI_error_store",
+    "fisher_cache",
+    "fisher_bias",
+    "AET_inner_product",
+    "snr_sketch",
+    "catalogues",
+    "convert_npy_to_text_or_hdf5",
+]
+
+
+class ImportTime(NamedTuple):
+    module: str
+    total_us: int  # cumulative import time of the module itself
+    wall_s: float  # wall time of the whole interpreter run
+    heaviest: list[tuple[str, int]]  # (direct import, cumulative us), slowest first
+    log: str
+
+
+def parse_importtime(log: str) -> list[tuple[int, str, int]]:
+    """(nesting depth, module, cumulative us) for every line of an -X importtime log."""
+    rows = []
+    for line in log.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        stripped = name.rstrip()
+        depth = (len(stripped) - len(stripped.lstrip()) - 1)//2
+        rows.append((depth, stripped.strip(), int(cumulative)))
+    return rows
+
+
+def time_import(module: str, repeat: int = 3, top: int = 5) -> ImportTime:
+    best = None
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT,
+            capture_output=True,
+            text=True,
+        )
+        wall_s = time.perf_counter() - t0
+        if proc.returncode != 0:
+            raise RuntimeError(f"import {module} failed:\n{proc.stderr.splitlines()[-1] if proc.stderr else ''}")
+        rows = parse_importtime(proc.stderr)
+        end = max(k for k, (depth, name, _) in enumerate(rows) if depth == 0 and name == module)
+        total_us = rows[end][2]
+        if best is None or total_us < best.total_us:
+            #Direct imports of the module are the depth-1 rows just above its own row
+            direct = []
+            for depth, name, cumulative in reversed(rows[:end]):
+                if depth == 0:
+                    break
+                if depth == 1:
+                    direct.append((name, cumulative))
+            heaviest = sorted(direct, key=lambda item: -item[1])[:top]
+            best = ImportTime(module, total_us, wall_s, heaviest, proc.stderr)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("modules", nargs="*", help="Entry points to time (default: every figure and tool)")
+    p.add_argument("--repeat", type=int, default=3, help="Interpreter runs per module, best kept (default: 3)")
+    p.add_argument("--top", type=int, default=5, help="Heaviest direct imports to list (default: 5)")
+    p.add_argument("--output", type=Path, default=Path("startup_importtime.json"), help="JSON results file")
+    p.add_argument("--raw-dir", type=Path, help="Also write each module's -X importtime log here")
+    args = p.parse_args()
+
+    modules = [Path(m).stem for m in args.modules] or sorted(p.stem for p in ROOT.glob("*_fig.py")) + entry_points
+    results = {}
+    failed = []
+    print(f"{'entry point':<32s} {'import [ms]':>11s} {'wall [ms]':>10s}  heaviest direct imports [ms]")
+    for module in modules:
+        try:
+            result = time_import(module, args.repeat, args.top)
+        except RuntimeError as exc:
+            failed.append(module)
+            print(f"{module:<32s} FAILED: {exc}", file=sys.stderr)
+            continue
+        heaviest = ", ".join(f"{name} {cumulative/1e3:.0f}" for name, cumulative in result.heaviest)
+        print(f"{module:<32s} {result.total_us/1e3:11.1f} {result.wall_s*1e3:10.1f}  {heaviest}")
+        results[module] = {"import_us": result.total_us, "wall_s": result.wall_s, "heaviest": result.heaviest}
+        if args.raw_dir is not None:
+            args.raw_dir.mkdir(parents=True, exist_ok=True)
+            (args.raw_dir / f"{module}.txt").write_text(result.log)
+
+    args.output.write_text(json.dumps({"python": sys.version, "results": results}, indent=1))
+    print(f"Wrote {args.output}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+"""
+Benchmark the text backends of convert_npy_to_text_or_hdf5.py.
+
+Writes random arrays with representative shapes through
+save_array_as_text() with text_backend="savetxt" and "fast", checks the two
+files are byte-identical, and prints the best-of-N wall time of each, with
+the backend the default text_backend="auto" picks for that dtype. Float
+arrays are listed as not sped up when "fast" is less than twice as quick:
+the speed-up asked for only holds for integer and bool arrays.
+
+Shapes:
+  - errors: (N, 12) glitch error arrays
+  - chain:  (iterations, temps, walkers, params) MCMC chains
+
+Usage:
+    python benchmark_text_export.py
+    python benchmark_text_export.py --rows 1000000 --repeat 5 --delimiter tab
+"""
+
+from __future__ import annotations
+
+import argparse
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+from convert_npy_to_text_or_hdf5 import auto_text_backend, save_array_as_text
+
+
+def time_backend(arr: np.ndarray, out_path: Path, backend: str, repeat: int, **kwargs) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        save_array_as_text(arr, out_path, text_backend=backend, **kwargs)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--rows", type=int, default=200000, help="Rows of the (N, 12) error array (default: 200000)")
+    p.add_argument("--iterations", type=int, default=2000, help="Iterations of the chain array (default: 2000)")
+    p.add_argument("--repeat", type=int, default=3, help="Timed repeats per backend (default: 3)")
+    p.add_argument("--delimiter", choices=[",", "tab", "space"], default=",")
+    p.add_argument("--floatfmt", default="%.10g")
+    args = p.parse_args()
+
+    delimiter = {",": ",", "tab": "\t", "space": " "}[args.delimiter]
+    rng = np.random.default_rng(1234)
+    cases = {
+        "errors (N, 12) float64": rng.standard_normal((args.rows, 12)),
+        "chain (iter, temps, walkers, params) float64": rng.standard_normal((args.iterations, 4, 32, 12)),
+        "errors (N, 12) float32": rng.standard_normal((args.rows, 12)).astype(np.float32),
+        "indices (N,) int64": rng.integers(0, 10**9, size=args.rows),
+    }
+
+    print(f"{'case':<46s} {'savetxt [s]':>12s} {'fast [s]':>10s} {'speed-up':>9s}  auto")
+    not_sped_up = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, arr in cases.items():
+            ref_path, fast_path = Path(tmp) / "savetxt.csv", Path(tmp) / "fast.csv"
+            kwargs = dict(delimiter=delimiter, floatfmt=args.floatfmt)
+            t_ref = time_backend(arr, ref_path, "savetxt", args.repeat, **kwargs)
+            t_fast = time_backend(arr, fast_path, "fast", args.repeat, **kwargs)
+            if ref_path.read_bytes() != fast_path.read_bytes():
+                raise SystemExit(f"{name}: fast backend output differs from np.savetxt")
+            print(f"{name:<46s} {t_ref:12.3f} {t_fast:10.3f} {t_ref / t_fast:8.2f}x  {auto_text_backend(arr)}")
+            if t_ref / t_fast < 2:
+                not_sped_up.append(name)
+    if not_sped_up:
+        print(f"\nNo faster text export for: {', '.join(not_sped_up)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,171 @@
+#!/usr/bin/env python3
+"""
+Persistent index of the optimal SNRs of the glitch backgrounds.
+
+Every ``BG_{idx}_AET.h5`` file in a ``max_glitch_SNR_{SNR}`` directory holds a
+single scalar dataset ``SNR``. Opening thousands of them one after another is
+slow on a networked filesystem, so ``update_index`` lists the directory once,
+re-opens only files that are new or whose size or mtime changed (in a thread
+pool, since the cost is I/O latency), and keeps the result in
+
+    {AET dir}/cache/BG_SNR_index.npy
+
+as a structured array with fields (bg_idx, SNR, size, mtime_ns), sorted by
+bg_idx. Rows of deleted files are dropped.
+
+Example:
+
+    from bg_snr_index import load_bg_SNRs
+    index = load_bg_SNRs(90.0)
+    SNR_of_bg_12 = index["SNR"][np.searchsorted(index["bg_idx"], 12)]
+
+Usage:
+    python bg_snr_index.py                           # update all cuts, print a summary
+    python bg_snr_index.py --max-glitch-snr 8.0 --bg 12 13
+    python bg_snr_index.py --no-update               # query the stored index only
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Iterable
+
+import numpy as np
+
+glitch_bg_AET_dir = "data_files/glitch_bg_AET/"
+default_max_glitch_SNR = [np.inf, 400.0, 90.0, 8.0]
+
+CACHE_SUBDIR = "cache"
+INDEX_NAME = "BG_SNR_index.npy"
+INDEX_DTYPE = np.dtype([("bg_idx", "i8"), ("SNR", "f8"), ("size", "i8"), ("mtime_ns", "i8")])
+
+_AET_PATTERN = re.compile(r"^BG_(\d+)_AET\.h5$")
+
+
+def AET_dir(max_glitch_SNR: float) -> Path:
+    return Path(glitch_bg_AET_dir) / f"max_glitch_SNR_{float(max_glitch_SNR)}"
+
+
+def index_path(directory: str | Path) -> Path:
+    return Path(directory) / CACHE_SUBDIR / INDEX_NAME
+
+
+def load_index(directory: str | Path) -> np.ndarray:
+    """The stored index of a directory, or an empty one, without touching the AET files."""
+    path = index_path(directory)
+    if not path.exists():
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    index = np.load(path, allow_pickle=False)
+    if index.dtype != INDEX_DTYPE:
+        return np.zeros(0, dtype=INDEX_DTYPE)
+    return index
+
+
+def _read_SNR(path: str) -> float:
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        return float(f["SNR"][()])
+
+
+def update_index(directory: str | Path, workers: int = 16, refresh: bool = False) -> np.ndarray:
+    """Bring the index of ``directory`` up to date and return it.
+
+    ``refresh`` re-reads every file regardless of the stored size and mtime.
+    """
+    directory = Path(directory)
+    #One listing and one stat per file; no HDF5 opens yet
+    found = {}
+    with os.scandir(directory) as it:
+        for entry in it:
+            match = _AET_PATTERN.match(entry.name)
+            if match is not None and entry.is_file():
+                st = entry.stat()
+                found[int(match.group(1))] = (entry.path, st.st_size, st.st_mtime_ns)
+
+    old = {} if refresh else {int(row["bg_idx"]): row for row in load_index(directory)}
+    stale = [
+        bg_idx for bg_idx, (_, size, mtime_ns) in found.items()
+        if bg_idx not in old or old[bg_idx]["size"] != size or old[bg_idx]["mtime_ns"] != mtime_ns
+    ]
+    if stale:
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+            new_SNRs = dict(zip(stale, pool.map(_read_SNR, [found[bg_idx][0] for bg_idx in stale])))
+    else:
+        new_SNRs = {}
+
+    bg_ids = sorted(found)
+    index = np.zeros(len(bg_ids), dtype=INDEX_DTYPE)
+    for row, bg_idx in zip(index, bg_ids):
+        _, size, mtime_ns = found[bg_idx]
+        row["bg_idx"] = bg_idx
+        row["SNR"] = new_SNRs[bg_idx] if bg_idx in new_SNRs else old[bg_idx]["SNR"]
+        row["size"] = size
+        row["mtime_ns"] = mtime_ns
+
+    if stale or len(old) != len(index):
+        path = index_path(directory)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.save(f, index)
+        os.replace(tmp, path)
+    return index
+
+
+def load_bg_SNRs(max_glitch_SNR: float, workers: int = 16, update: bool = True) -> np.ndarray:
+    """Up-to-date (or, with update=False, stored) index for one max glitch SNR cut."""
+    directory = AET_dir(max_glitch_SNR)
+    return update_index(directory, workers=workers) if update else load_index(directory)
+
+
+def lookup_SNRs(index: np.ndarray, bg_ids: Iterable[int]) -> np.ndarray:
+    """Optimal SNRs of the given backgrounds; NaN for ids missing from the index."""
+    bg_ids = np.asarray(list(bg_ids), dtype=np.int64)
+    SNRs = np.full(len(bg_ids), np.nan)
+    if len(index):
+        pos = np.minimum(np.searchsorted(index["bg_idx"], bg_ids), len(index) - 1)
+        hit = index["bg_idx"][pos] == bg_ids
+        SNRs[hit] = index["SNR"][pos[hit]]
+    return SNRs
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument(
+        "--max-glitch-snr",
+        nargs="+",
+        type=float,
+        default=default_max_glitch_SNR,
+        help="Max glitch SNR cuts (default: inf 400 90 8)",
+    )
+    p.add_argument("--jobs", type=int, default=16, help="Reader threads (default: 16)")
+    p.add_argument("--refresh", action="store_true", help="Re-read every file")
+    p.add_argument("--no-update", action="store_true", help="Only read the stored index")
+    p.add_argument("--bg", nargs="+", type=int, help="Print the SNRs of these background ids")
+    args = p.parse_args()
+
+    for SNR in args.max_glitch_snr:
+        directory = AET_dir(SNR)
+        if args.no_update:
+            index = load_index(directory)
+        else:
+            index = update_index(directory, workers=args.jobs, refresh=args.refresh)
+        if args.bg:
+            for bg_idx, bg_SNR in zip(args.bg, lookup_SNRs(index, args.bg)):
+                print(f"max glitch SNR {SNR}: BG_{bg_idx:04} optimal SNR {bg_SNR:.6g}")
+        elif len(index):
+            print(
+                f"max glitch SNR {SNR}: {len(index)} backgrounds, optimal SNR "
+                f"min {index['SNR'].min():.4g}, median {np.median(index['SNR']):.4g}, max {index['SNR'].max():.4g}"
+            )
+        else:
+            print(f"max glitch SNR {SNR}: no backgrounds indexed in {directory}")
+
+
+if __name__ == "__main__":
+    main()
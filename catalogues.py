@@ -0,0 +1,182 @@
+#!/usr/bin/env python3
+"""
+Text glitch catalogues, parsed once and memory-mapped afterwards.
+
+``load_catalogue`` parses a whitespace-separated text file (``#`` comments)
+with numpy's C reader the first time, and writes the (n_rows, n_columns)
+float64 table as an .npy sidecar named after the sha256 of the text,
+
+    {source dir}/cache/{name}.{path hash}.{sha256[:16]}.npy
+
+(or ``cache/catalogues/`` here when the source directory is not writable).
+The path hash is of the resolved source path, so same-named sources from
+different directories keep separate sidecars and stamps in a shared cache
+directory. The source's size and mtime are recorded next to it, so later
+loads neither parse nor hash the text: they memory-map the sidecar
+(zero-copy, read-only).
+An edited source gets a new hash and is parsed again; the old sidecar is
+removed.
+
+Known catalogues have named columns, returned as a structured view of the
+same memory:
+
+    LPF effective glitch parameters  Beta, Alpha (signed), SNR
+    LISA glitch SNRs                 SNR
+
+Example:
+
+    from catalogues import load_LISA_SNRs, load_LPF_parameters
+    LISA_SNRs = load_LISA_SNRs()                                  # (n,) memmap
+    LPF = load_LPF_parameters("2021-09-17-effective_glitch_parameters_cold.txt")
+    LPF["SNR"], np.abs(LPF["Alpha"])
+
+Usage:
+    python catalogues.py data_files/LISA_glitch_SNRs.txt      # build sidecars, compare with np.loadtxt
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+
+CACHE_SUBDIR = "cache"
+FALLBACK_CACHE_DIR = Path("cache/catalogues")
+
+LPF_COLUMNS = ("Beta", "Alpha", "SNR")
+LISA_SNR_COLUMNS = ("SNR",)
+LISA_SNR_file = "data_files/LISA_glitch_SNRs.txt"
+
+
+def _sha256(path: Path) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _source_key(source: Path) -> str:
+    """Cache file prefix of a source: its name and a hash of its resolved path."""
+    return f"{source.name}.{hashlib.sha256(str(source.resolve()).encode()).hexdigest()[:8]}"
+
+
+def _cache_dir(source: Path) -> Path:
+    directory = source.parent / CACHE_SUBDIR
+    try:
+        directory.mkdir(exist_ok=True)
+        if os.access(directory, os.W_OK):
+            return directory
+    except OSError:
+        pass
+    FALLBACK_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    return FALLBACK_CACHE_DIR
+
+
+def parse_catalogue(path: str | Path) -> np.ndarray:
+    """(n_rows, n_columns) float64 table of a text catalogue."""
+    return np.ascontiguousarray(np.loadtxt(path, ndmin=2, dtype=np.float64))
+
+
+def sidecar_path(path: str | Path, cache_dir: Optional[str | Path] = None) -> Path:
+    """Sidecar of the current contents of ``path`` (hashes the text)."""
+    source = Path(path)
+    directory = Path(cache_dir) if cache_dir is not None else _cache_dir(source)
+    return directory / f"{_source_key(source)}.{_sha256(source)[:16]}.npy"
+
+
+def _write_sidecar(source: Path, directory: Path) -> tuple[Path, str]:
+    digest = _sha256(source)
+    key = _source_key(source)
+    sidecar = directory / f"{key}.{digest[:16]}.npy"
+    if not sidecar.exists():
+        table = parse_catalogue(source)
+        tmp = sidecar.with_name(sidecar.name + f".{os.getpid()}.tmp")
+        with tmp.open("wb") as f:
+            np.save(f, table)
+        os.replace(tmp, sidecar)
+    #Sidecars of earlier contents of the same source
+    for old in directory.glob(f"{key}.*.npy"):
+        if old != sidecar and len(old.name) == len(sidecar.name):
+            old.unlink(missing_ok=True)
+    return sidecar, digest
+
+
+def load_catalogue(
+    path: str | Path,
+    columns: Optional[Sequence[str]] = None,
+    cache_dir: Optional[str | Path] = None,
+) -> np.ndarray:
+    """Memory-mapped table of a text catalogue, parsing it only if its sidecar is missing or stale.
+
+    With ``columns`` the rows are returned as a structured array with those
+    float64 fields (a view, not a copy); otherwise as (n_rows, n_columns).
+    """
+    source = Path(path)
+    directory = Path(cache_dir) if cache_dir is not None else _cache_dir(source)
+    directory.mkdir(parents=True, exist_ok=True)
+    stamp_file = directory / f"{_source_key(source)}.json"
+    st = source.stat()
+    stamp = [st.st_size, st.st_mtime_ns, str(source.resolve())]
+
+    sidecar = None
+    if stamp_file.exists():
+        known = json.loads(stamp_file.read_text())
+        candidate = directory / known["sidecar"]
+        if known["stamp"] == stamp and candidate.exists():
+            sidecar = candidate
+    if sidecar is None:
+        sidecar, digest = _write_sidecar(source, directory)
+        tmp = stamp_file.with_name(stamp_file.name + f".{os.getpid()}.tmp")
+        tmp.write_text(json.dumps({"stamp": stamp, "sha256": digest, "sidecar": sidecar.name}))
+        os.replace(tmp, stamp_file)
+
+    table = np.load(sidecar, mmap_mode="r")
+    if columns is None:
+        return table
+    if table.shape[1] != len(columns):
+        raise ValueError(f"{source}: {table.shape[1]} columns, expected {len(columns)} ({', '.join(columns)})")
+    return table.view(np.dtype([(name, np.float64) for name in columns]))[:, 0]
+
+
+def load_LPF_parameters(path: str | Path, cache_dir: Optional[str | Path] = None) -> np.ndarray:
+    """LPF effective glitch parameters with fields Beta, Alpha (+ve or -ve) and SNR."""
+    return load_catalogue(path, LPF_COLUMNS, cache_dir)
+
+
+def load_LISA_SNRs(path: str | Path = LISA_SNR_file, cache_dir: Optional[str | Path] = None) -> np.ndarray:
+    """SNRs of the simulated LISA glitch catalogue, shape (n,)."""
+    return load_catalogue(path, LISA_SNR_COLUMNS, cache_dir)["SNR"]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("paths", nargs="+", type=Path, help="Text catalogues")
+    p.add_argument("--cache-dir", type=Path, help="Where to keep the sidecars (default: cache/ next to each file)")
+    args = p.parse_args()
+
+    for path in args.paths:
+        t0 = time.perf_counter()
+        reference = np.loadtxt(path, ndmin=2)
+        t_loadtxt = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        load_catalogue(path, cache_dir=args.cache_dir)
+        t_first = time.perf_counter() - t0
+        t0 = time.perf_counter()
+        table = load_catalogue(path, cache_dir=args.cache_dir)
+        t_cached = time.perf_counter() - t0
+        same = table.shape == reference.shape and np.array_equal(table, reference, equal_nan=True)
+        print(
+            f"{path}: {table.shape[0]} rows x {table.shape[1]} columns, np.loadtxt {t_loadtxt*1e3:.1f} ms, "
+            f"first load {t_first*1e3:.1f} ms, cached {t_cached*1e3:.2f} ms, {'identical' if same else 'DIFFERENT'}"
+        )
+
+
+if __name__ == "__main__":
+    main()
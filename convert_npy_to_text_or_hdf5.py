@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 """
-Convert .npy (and .npz) files to human-readable text (CSV/TSV)
-and/or a consolidated HDF5 file.
+Convert .npy (and .npz) files to human-readable text (CSV/TSV),
+a consolidated HDF5 file and/or columnar Parquet/Arrow/Zarr outputs.
 
 Usage examples:
 
@@ -17,18 +17,54 @@ Usage examples:
   - Only HDF5:
       python convert_npy_to_text_or_hdf5.py --format hdf5
 
+  - Convert on 8 cores (data.h5 is identical to a serial run):
+      python convert_npy_to_text_or_hdf5.py --format both --jobs 8
+
+  - Compressed, row-chunked HDF5 with float64 stored as float32 where that
+    loses less than 1e-6 relative precision:
+      python convert_npy_to_text_or_hdf5.py --format hdf5 --compression gzip --compression-level 4 \\
+          --shuffle --downcast float32 --downcast-tolerance 1e-6
+
+  - Only re-export files that changed since the last --incremental run
+    (and drop exports of deleted sources):
+      python convert_npy_to_text_or_hdf5.py --format both --incremental
+
+  - Columnar outputs (one column per parameter, dtype and shape kept as
+    metadata); formats can be combined:
+      python convert_npy_to_text_or_hdf5.py --format parquet arrow zarr hdf5
+
+  - Stream arrays larger than RAM (memory-mapped reads, 100k-row blocks):
+      python convert_npy_to_text_or_hdf5.py --format both --stream --block-rows 100000
+
+Columnar layout: arrays are viewed as (rows, columns) with columns along the
+last axis, e.g. a (iter, temps, walkers, params) chain becomes
+iter*temps*walkers rows of one column per parameter. 12-column arrays use the
+param_names of EMRI_settings.py, 1-D arrays have a single "value" column and
+structured arrays one column per field. The original shape and dtype are
+stored as metadata; read_columnar() restores the array, and Arrow IPC files
+are memory-mapped so their columns are read zero-copy.
+
 Requirements:
   - NumPy (required)
   - h5py (optional, only if using --format hdf5 or both)
+  - pyarrow (optional, only for --format parquet or arrow)
+  - zarr (optional, only for --format zarr)
 """
 
 from __future__ import annotations
 
 import argparse
 import csv
+import hashlib
+import json
 import os
+import shutil
+import time
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from importlib.util import find_spec
 from pathlib import Path
-from typing import Iterable, Optional
+from typing import Iterable, NamedTuple, Optional, Union
 
 import numpy as np
 
@@ -37,6 +73,15 @@ try:
 except Exception:  # h5py is optional
     h5py = None  # type: ignore
 
+# pyarrow and zarr are optional and slow to import, so they are only
+# imported by the columnar writers and readers
+HAVE_PYARROW = find_spec("pyarrow") is not None
+HAVE_ZARR = find_spec("zarr") is not None
+
+from EMRI_settings import param_names
+
+COLUMNAR_FORMATS = {"parquet": ".parquet", "arrow": ".arrow", "zarr": ".zarr"}
+
 
 def iter_target_files(root: Path, patterns: Iterable[str]) -> Iterable[Path]:
     for pat in patterns:
@@ -55,12 +100,80 @@ def ensure_dir(p: Path) -> None:
     p.mkdir(parents=True, exist_ok=True)
 
 
+def iter_row_blocks(arr: np.ndarray, block_rows: int) -> Iterable[np.ndarray]:
+    """Yield consecutive slabs of at most block_rows rows along the first axis."""
+    for start in range(0, arr.shape[0], block_rows):
+        yield arr[start:start + block_rows]
+
+
+def load_npy(src_path: Path, stream: bool) -> np.ndarray:
+    """Load a .npy file, memory-mapped read-only when streaming."""
+    if stream:
+        try:
+            return np.load(src_path, mmap_mode="r", allow_pickle=False)
+        except ValueError:
+            # Object arrays cannot be memory-mapped; fall through to a full load
+            pass
+    return np.load(src_path, allow_pickle=False)
+
+
+TEXT_BUFFER_BYTES = 16 * 2**20
+FAST_TEXT_BLOCK_ELEMENTS = 2**18
+
+
+def row_format(fmt: str, ncol: int, delimiter: str) -> str:
+    """Per-row printf format, following np.savetxt's rules for a str fmt."""
+    n_fmt_chars = fmt.count("%")
+    if n_fmt_chars == 1:
+        return delimiter.join([fmt] * ncol)
+    if n_fmt_chars != ncol:
+        raise ValueError(f"fmt has wrong number of % formats: {fmt}")
+    return fmt
+
+
+def auto_text_backend(arr: np.ndarray) -> str:
+    """Text backend used by text_backend="auto": block formatting only pays off for integers and bools.
+
+    There is no faster path for floats: the time goes into formatting each
+    value, which "fast" does no quicker than np.savetxt (about 0.9-1.4x on the
+    (N, 12) error arrays and chains of benchmark_text_export.py). A
+    vectorised formatter building the digits as NumPy character arrays was
+    byte-identical but slower still (0.45-0.71x).
+    """
+    return "fast" if arr.dtype.kind in "iub" else "savetxt"
+
+
+def write_numeric_rows(f, arr: np.ndarray, fmt: str, delimiter: str, block_rows: Optional[int] = None) -> None:
+    """Write the rows of a 1-D/2-D (or reshaped N-D) numeric array exactly as
+    np.savetxt(fmt=fmt, delimiter=delimiter) would, but formatting a whole
+    block of rows with one % operation instead of one per row."""
+    ncol = 1 if arr.ndim == 1 else int(np.prod(arr.shape[1:], dtype=np.int64))
+    line = row_format(fmt, ncol, delimiter) + "\n"
+    if block_rows is None:
+        block_rows = max(1, FAST_TEXT_BLOCK_ELEMENTS // max(ncol, 1))
+    for block in iter_row_blocks(arr, block_rows):
+        # tolist() gives Python scalars, which % formats exactly like NumPy's
+        values = np.asarray(block).reshape(-1).tolist()
+        f.write((line * block.shape[0]) % tuple(values))
+
+
 def save_array_as_text(
     arr: np.ndarray,
     out_path: Path,
     delimiter: str = ",",
     floatfmt: str = "%.10g",
+    block_rows: Optional[int] = None,
+    text_backend: str = "auto",
 ) -> None:
+    """Write arr as text. With block_rows set, numeric arrays are formatted
+    block_rows rows at a time so peak memory does not grow with arr.
+
+    text_backend "fast" formats numeric arrays in blocks through a large
+    write buffer; "savetxt" uses np.savetxt. Both give identical files.
+    "auto" (default) uses "fast" only for integer and bool arrays, where it
+    is several times faster. Float arrays, including the error arrays and
+    chains, are not exported any faster than before (see auto_text_backend).
+    """
     ensure_dir(out_path.parent)
 
     # Structured arrays: write as CSV with header of field names
@@ -76,20 +189,36 @@ def save_array_as_text(
     # For numeric/bool dtypes: use np.savetxt. For ndim>2 reshape and keep a header
     if arr.dtype.kind in "iufb":
         header = f"original_shape={arr.shape} dtype={arr.dtype}"
-        if arr.ndim == 1:
-            data = arr
-        elif arr.ndim == 2:
+        if arr.ndim > 2:
+            header += " reshaped_to_rows=arr.shape[0], cols=product(remaining_dims)"
+        fmt = floatfmt if arr.dtype.kind == "f" else "%s"
+        if text_backend == "auto":
+            text_backend = auto_text_backend(arr)
+        if text_backend == "fast" and arr.ndim >= 1:
+            with out_path.open("w", buffering=TEXT_BUFFER_BYTES) as f:
+                f.write("# " + header + "\n")
+                write_numeric_rows(f, arr, fmt, delimiter, block_rows)
+            return
+        if block_rows is not None and arr.ndim >= 1:
+            # Reshape block by block so a memory-mapped arr is never copied whole
+            with out_path.open("w") as f:
+                f.write("# " + header + "\n")
+                for block in iter_row_blocks(arr, block_rows):
+                    if block.ndim > 2:
+                        block = block.reshape(block.shape[0], -1)
+                    np.savetxt(f, block, delimiter=delimiter, fmt=fmt)
+            return
+        if arr.ndim <= 2:
             data = arr
         else:
             # Flatten last dims into columns; keep first dim as rows
             first = arr.shape[0]
             data = arr.reshape(first, -1)
-            header += " reshaped_to_rows=arr.shape[0], cols=product(remaining_dims)"
         np.savetxt(
             out_path,
             data,
             delimiter=delimiter,
-            fmt=floatfmt if arr.dtype.kind == "f" else "%s",
+            fmt=fmt,
             header=header,
             comments="# ",
         )
@@ -109,17 +238,258 @@ def save_array_as_text(
                 f.write(delimiter.join(repr(x) for x in row) + "\n")
 
 
+def column_names(arr: np.ndarray) -> list[str]:
+    if arr.dtype.names:
+        return list(arr.dtype.names)
+    if arr.ndim <= 1:
+        return ["value"]
+    ncol = arr.shape[-1]
+    if ncol == len(param_names):
+        return list(param_names)
+    return [f"col_{j}" for j in range(ncol)]
+
+
+def as_columns(block: np.ndarray) -> list[np.ndarray]:
+    """Split a block into contiguous 1-D columns (rows along all but the last axis)."""
+    if block.dtype.names:
+        return [np.ascontiguousarray(block[name]).reshape(-1) for name in block.dtype.names]
+    if block.ndim <= 1:
+        return [np.ascontiguousarray(block).reshape(-1)]
+    flat = block.reshape(-1, block.shape[-1])
+    return [np.ascontiguousarray(flat[:, j]) for j in range(flat.shape[1])]
+
+
+def columnar_metadata(arr: np.ndarray) -> dict[str, str]:
+    return {
+        "original_shape": json.dumps(list(arr.shape)),
+        "dtype": json.dumps(arr.dtype.descr if arr.dtype.names else arr.dtype.str),
+        "columns": json.dumps(column_names(arr)),
+    }
+
+
+def save_array_as_columns(
+    arr: np.ndarray,
+    out_path: Path,
+    fmt: str,
+    block_rows: Optional[int] = None,
+    zarr_chunk_rows: int = 65536,
+) -> None:
+    """Write arr as one column per parameter in fmt ("parquet", "arrow" or
+    "zarr"). block_rows writes row blocks (Parquet row groups, Arrow record
+    batches, Zarr slabs) so peak memory does not grow with arr."""
+    if arr.ndim == 0 or arr.dtype.hasobject or (
+        arr.dtype.names and any(arr.dtype[name].shape or arr.dtype[name].hasobject for name in arr.dtype.names)
+    ):
+        print(f"Skipping {out_path.name}: only numeric arrays and flat structured arrays can be stored as columns")
+        return
+    ensure_dir(out_path.parent)
+    names = column_names(arr)
+    metadata = columnar_metadata(arr)
+    dtypes = [arr.dtype[name] for name in arr.dtype.names] if arr.dtype.names else [arr.dtype] * len(names)
+    blocks = iter_row_blocks(arr, block_rows) if block_rows is not None else [arr]
+
+    if fmt == "zarr":
+        import zarr  # type: ignore
+
+        n_rows = int(np.prod(arr.shape[:-1], dtype=np.int64)) if arr.ndim > 1 and not arr.dtype.names else arr.shape[0]
+        if out_path.exists():
+            shutil.rmtree(out_path)
+        grp = zarr.open_group(str(out_path), mode="w")
+        grp.attrs.update({key: json.loads(value) for key, value in metadata.items()})
+        create = getattr(grp, "create_array", None) or grp.create_dataset
+        zcols = [
+            create(name, shape=(n_rows,), dtype=dtype, chunks=(max(1, min(zarr_chunk_rows, n_rows)),))
+            for name, dtype in zip(names, dtypes)
+        ]
+        start = 0
+        for block in blocks:
+            cols = as_columns(block)
+            for zcol, col in zip(zcols, cols):
+                zcol[start:start + len(col)] = col
+            start += len(cols[0])
+        return
+
+    import pyarrow as pa  # type: ignore
+    from pyarrow import ipc  # type: ignore
+
+    schema = pa.schema([pa.field(name, pa.from_numpy_dtype(dtype)) for name, dtype in zip(names, dtypes)], metadata=metadata)
+    # Created before the first block, so an array with no rows still gets an (empty) file
+    if fmt == "parquet":
+        import pyarrow.parquet as pq  # type: ignore
+
+        writer = pq.ParquetWriter(str(out_path), schema)
+    else:
+        writer = ipc.new_file(str(out_path), schema)
+    try:
+        for block in blocks:
+            columns = [pa.array(col, type=field.type) for col, field in zip(as_columns(block), schema)]
+            writer.write_batch(pa.RecordBatch.from_arrays(columns, schema=schema))
+    finally:
+        writer.close()
+
+
+def read_columnar(path: str | Path) -> tuple[dict[str, np.ndarray], dict]:
+    """Read a file written by save_array_as_columns.
+
+    Returns ({column name: 1-D array}, metadata). Arrow IPC files are
+    memory-mapped and single-batch columns are returned without copying.
+    Use restore_array() to get the original N-D array back.
+    """
+    path = Path(path)
+    if path.suffix == ".zarr":
+        import zarr  # type: ignore
+
+        grp = zarr.open_group(str(path), mode="r")
+        meta = dict(grp.attrs)
+        return {name: grp[name][:] for name in meta["columns"]}, meta
+    import pyarrow as pa  # type: ignore
+
+    if path.suffix == ".arrow":
+        from pyarrow import ipc  # type: ignore
+
+        table = ipc.open_file(pa.memory_map(str(path), "r")).read_all()
+    else:
+        import pyarrow.parquet as pq  # type: ignore
+
+        table = pq.read_table(str(path), memory_map=True)
+    meta = {k.decode(): json.loads(v) for k, v in (table.schema.metadata or {}).items()}
+    columns = {}
+    for name in table.column_names:
+        col = table.column(name)
+        columns[name] = col.chunk(0).to_numpy(zero_copy_only=False) if col.num_chunks == 1 else col.to_numpy()
+    return columns, meta
+
+
+def restore_array(columns: dict[str, np.ndarray], meta: dict) -> np.ndarray:
+    shape = tuple(meta["original_shape"])
+    dtype = meta["dtype"]
+    if isinstance(dtype, list):
+        out = np.empty(shape, dtype=np.dtype([tuple(d) for d in dtype]))
+        for name in out.dtype.names:
+            out[name] = columns[name]
+        return out
+    cols = [columns[name] for name in meta["columns"]]
+    if len(shape) <= 1:
+        return np.asarray(cols[0], dtype=dtype).reshape(shape)
+    return np.stack(cols, axis=-1).astype(dtype, copy=False).reshape(shape)
+
+
+class HDF5Layout(NamedTuple):
+    """Storage options for datasets written by add_array_to_hdf5."""
+
+    compression: Optional[str] = None  # "gzip", "lzf" or None
+    compression_level: Optional[int] = None  # gzip only, 0-9
+    shuffle: bool = False
+    chunks: Union[str, tuple[int, ...], None] = "auto"  # "auto", a chunk shape, or None (contiguous)
+    chunk_bytes: int = 2**20  # target chunk size for "auto"
+    downcast: Optional[str] = None  # e.g. "float32"
+    downcast_tolerance: float = 0.0  # max relative error allowed by downcast
+
+
+def auto_chunks(shape: tuple[int, ...], itemsize: int, chunk_bytes: int) -> tuple[int, ...]:
+    """Whole rows, as many as fit in chunk_bytes, so row slices touch few chunks."""
+    row_bytes = itemsize * int(np.prod(shape[1:], dtype=np.int64))
+    rows = min(shape[0], max(1, chunk_bytes // max(row_bytes, 1)))
+    return (rows,) + tuple(shape[1:])
+
+
+def resolve_chunks(layout: HDF5Layout, shape: tuple[int, ...], itemsize: int) -> Optional[tuple[int, ...]]:
+    if not shape or 0 in shape:
+        return None
+    if isinstance(layout.chunks, tuple) and len(layout.chunks) == len(shape):
+        return tuple(max(1, min(c, n)) for c, n in zip(layout.chunks, shape))
+    if layout.chunks is None and layout.compression is None and not layout.shuffle:
+        return None
+    # "auto", a chunk shape of the wrong rank, or filters that need chunking
+    return auto_chunks(shape, itemsize, layout.chunk_bytes)
+
+
+def downcast_dtype(arr: np.ndarray, layout: HDF5Layout, block_rows: Optional[int] = None) -> np.dtype:
+    """dtype to store arr with: layout.downcast if every element round-trips
+    within layout.downcast_tolerance (relative), else arr's own dtype."""
+    if layout.downcast is None or arr.dtype.kind != "f" or arr.ndim == 0:
+        return arr.dtype
+    target = np.dtype(layout.downcast)
+    if target.kind != "f" or target.itemsize >= arr.dtype.itemsize:
+        return arr.dtype
+    blocks = iter_row_blocks(arr, block_rows) if block_rows is not None else [arr]
+    with np.errstate(over="ignore", invalid="ignore"):
+        for block in blocks:
+            block = np.asarray(block)
+            err = np.abs(block.astype(target).astype(arr.dtype) - block)
+            ok = (err <= layout.downcast_tolerance * np.abs(block)) | (block == block.astype(target))
+            if not np.all(ok | np.isnan(block)):
+                return arr.dtype
+    return target
+
+
 def add_array_to_hdf5(
     h5: "h5py.File",
     group_path: str,
     name: str,
     arr: np.ndarray,
-) -> None:
-    grp = h5.require_group(group_path)
+    block_rows: Optional[int] = None,
+    layout: HDF5Layout = HDF5Layout(),
+) -> tuple[int, int, float]:
+    """Write arr to group_path/name. With block_rows set, the dataset is
+    created empty and filled by slab assignment block_rows rows at a time.
+
+    Returns (input bytes, bytes stored in the file, seconds spent writing).
+    """
+    t0 = time.perf_counter()
+    grp = require_group(h5, group_path)
     dset_path = f"{group_path}/{name}" if group_path else name
     if dset_path in h5:
         del h5[dset_path]
-    grp.create_dataset(name, data=arr)
+    # No creation timestamps, so identical inputs give a byte-identical file
+    if arr.dtype.hasobject:
+        dset = grp.create_dataset(name, data=arr, track_times=False)
+        return arr.nbytes, dset.id.get_storage_size(), time.perf_counter() - t0
+
+    dtype = downcast_dtype(arr, layout, block_rows)
+    chunks = resolve_chunks(layout, arr.shape, dtype.itemsize)
+    filters = {}
+    if chunks is not None:
+        filters = dict(
+            chunks=chunks,
+            compression=layout.compression,
+            compression_opts=layout.compression_level if layout.compression == "gzip" else None,
+            shuffle=layout.shuffle,
+        )
+    if block_rows is None or arr.ndim == 0:
+        dset = grp.create_dataset(name, data=np.asarray(arr, dtype=dtype), track_times=False, **filters)
+    else:
+        dset = grp.create_dataset(name, shape=arr.shape, dtype=dtype, track_times=False, **filters)
+        for start in range(0, arr.shape[0], block_rows):
+            dset[start:start + block_rows] = arr[start:start + block_rows]
+    return arr.nbytes, dset.id.get_storage_size(), time.perf_counter() - t0
+
+
+def require_group(h5: "h5py.File", group_path: str) -> "h5py.Group":
+    """Like h5.require_group, but intermediate groups are created without timestamps."""
+    grp = h5
+    for part in [p for p in group_path.split("/") if p and p != "."]:
+        if part not in grp:
+            gcpl = h5py.h5p.create(h5py.h5p.GROUP_CREATE)
+            gcpl.set_obj_track_times(False)
+            h5py.h5g.create(grp.id, part.encode(), gcpl=gcpl)
+        grp = grp[part]
+    return grp
+
+
+def hdf5_group_path(src_path: Path, root: Path) -> str:
+    return str(safe_relpath(src_path, root).parent).replace("\\", "/")
+
+
+def iter_source_arrays(src_path: Path, stream: bool = False) -> Iterable[tuple[str, np.ndarray]]:
+    """Yield (output name, array) for a .npy file or for each member of a .npz file."""
+    base = src_path.stem
+    if src_path.suffix == ".npz":
+        with np.load(src_path, allow_pickle=False) as npz:
+            for key in npz.files:
+                yield f"{base}__{key}", npz[key]
+    else:  # .npy
+        yield base, load_npy(src_path, stream=stream)
 
 
 def convert_file(
@@ -131,29 +501,124 @@ def convert_file(
     delimiter: str,
     floatfmt: str,
     hdf5_file: Optional["h5py.File"],
-) -> None:
-    rel = safe_relpath(src_path, root)
-    base = src_path.stem
-    rel_parent = rel.parent
+    block_rows: Optional[int] = None,
+    layout: HDF5Layout = HDF5Layout(),
+    text_backend: str = "auto",
+    columnar_formats: tuple[str, ...] = (),
+) -> tuple[int, int, float]:
+    """Convert one .npy/.npz file. block_rows enables streaming (see --stream).
+
+    Returns the summed HDF5 write stats of add_array_to_hdf5.
+    """
+    stats = (0, 0, 0.0)
+    rel_parent = safe_relpath(src_path, root).parent
+    group_path = hdf5_group_path(src_path, root)
+    for name, arr in iter_source_arrays(src_path, stream=block_rows is not None):
+        if write_text:
+            out_path = outdir / rel_parent / f"{name}.csv"
+            save_array_as_text(arr, out_path, delimiter=delimiter, floatfmt=floatfmt, block_rows=block_rows,
+                               text_backend=text_backend)
+        for fmt in columnar_formats:
+            out_path = outdir / rel_parent / f"{name}{COLUMNAR_FORMATS[fmt]}"
+            save_array_as_columns(arr, out_path, fmt, block_rows=block_rows)
+        if write_hdf5 and hdf5_file is not None:
+            written = add_array_to_hdf5(hdf5_file, group_path, name, arr, block_rows=block_rows, layout=layout)
+            stats = tuple(a + b for a, b in zip(stats, written))
+    return stats
+
+
+def convert_file_in_worker(
+    src_path: Path,
+    root: Path,
+    outdir: Path,
+    write_text: bool,
+    collect_arrays: bool,
+    delimiter: str,
+    floatfmt: str,
+    block_rows: Optional[int] = None,
+    text_backend: str = "auto",
+    columnar_formats: tuple[str, ...] = (),
+) -> list[tuple[str, str, np.ndarray]]:
+    """Process-pool half of --jobs: write the text/columnar outputs of one file and,
+    if collect_arrays, return (group path, name, array) for the HDF5 writer."""
+    rel_parent = safe_relpath(src_path, root).parent
+    group_path = hdf5_group_path(src_path, root)
+    collected = []
+    for name, arr in iter_source_arrays(src_path, stream=block_rows is not None):
+        if write_text:
+            out_path = outdir / rel_parent / f"{name}.csv"
+            save_array_as_text(arr, out_path, delimiter=delimiter, floatfmt=floatfmt, block_rows=block_rows,
+                               text_backend=text_backend)
+        for fmt in columnar_formats:
+            out_path = outdir / rel_parent / f"{name}{COLUMNAR_FORMATS[fmt]}"
+            save_array_as_columns(arr, out_path, fmt, block_rows=block_rows)
+        if collect_arrays:
+            collected.append((group_path, name, np.asarray(arr)))
+    return collected
+
+
+MANIFEST_VERSION = 2
+
 
+def file_digest(path: Path, block_size: int = 2**20) -> str:
+    h = hashlib.sha256()
+    with path.open("rb") as f:
+        for block in iter(lambda: f.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def output_names(src_path: Path) -> list[str]:
+    """Names iter_source_arrays will produce for src_path, without loading any data."""
     if src_path.suffix == ".npz":
         with np.load(src_path, allow_pickle=False) as npz:
-            for key in npz.files:
-                arr = npz[key]
-                if write_text:
-                    out_path = outdir / rel_parent / f"{base}__{key}.csv"
-                    save_array_as_text(arr, out_path, delimiter=delimiter, floatfmt=floatfmt)
-                if write_hdf5 and hdf5_file is not None:
-                    group_path = str(rel_parent).replace("\\", "/")
-                    add_array_to_hdf5(hdf5_file, group_path, f"{base}__{key}", arr)
-    else:  # .npy
-        arr = np.load(src_path, allow_pickle=False)
-        if write_text:
-            out_path = outdir / rel_parent / f"{base}.csv"
-            save_array_as_text(arr, out_path, delimiter=delimiter, floatfmt=floatfmt)
-        if write_hdf5 and hdf5_file is not None:
-            group_path = str(rel_parent).replace("\\", "/")
-            add_array_to_hdf5(hdf5_file, group_path, base, arr)
+            return [f"{src_path.stem}__{key}" for key in npz.files]
+    return [src_path.stem]
+
+
+def load_manifest(path: Path, settings: dict) -> dict:
+    """Entries of a previous --incremental run, or {} if there is none or it
+    was made with different output settings (forcing a full rebuild)."""
+    try:
+        with path.open() as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return {}
+    if manifest.get("version") != MANIFEST_VERSION or manifest.get("settings") != settings:
+        return {}
+    return manifest.get("files", {})
+
+
+def save_manifest(path: Path, settings: dict, entries: dict) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with tmp.open("w") as f:
+        json.dump({"version": MANIFEST_VERSION, "settings": settings, "files": entries}, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def source_changed(src_path: Path, entry: Optional[dict]) -> tuple[bool, dict]:
+    """Compare src_path with its manifest entry; the content hash is only
+    computed when size or mtime differ. Returns (changed, updated stat fields)."""
+    st = src_path.stat()
+    stat = {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+    if entry is not None and entry["size"] == st.st_size and entry["mtime_ns"] == st.st_mtime_ns:
+        return False, dict(stat, sha256=entry["sha256"])
+    digest = file_digest(src_path)
+    stat["sha256"] = digest
+    return entry is None or entry["sha256"] != digest, stat
+
+
+def remove_outputs(entry: dict, outdir: Path, h5: Optional["h5py.File"]) -> None:
+    for rel in entry.get("files", []):
+        out_path = outdir / rel
+        if out_path.is_dir():
+            shutil.rmtree(out_path)
+        else:
+            out_path.unlink(missing_ok=True)
+    if h5 is not None:
+        for dset_path in entry.get("hdf5", []):
+            if dset_path in h5:
+                del h5[dset_path]
 
 
 def main() -> None:
@@ -178,9 +643,11 @@ def main() -> None:
     )
     p.add_argument(
         "--format",
-        choices=["text", "hdf5", "both"],
-        default="text",
-        help="What to write: text, hdf5, or both (default: text)",
+        nargs="+",
+        choices=["text", "hdf5", "both", *COLUMNAR_FORMATS],
+        default=["text"],
+        help="What to write, one or more of: text, hdf5, both (= text hdf5),\n"
+        "parquet, arrow, zarr (default: text)",
     )
     p.add_argument(
         "--delimiter",
@@ -193,54 +660,249 @@ def main() -> None:
         default="%.10g",
         help="Printf-style float format for text output (default: %.10g)",
     )
+    p.add_argument(
+        "--text-backend",
+        choices=["auto", "fast", "savetxt"],
+        default="auto",
+        help="Numeric text formatter: block-wise 'fast' or np.savetxt; the output\n"
+        "is identical. 'auto' (default) uses 'fast' for integer and bool arrays\n"
+        "only; float arrays are no faster with either, see benchmark_text_export.py",
+    )
     p.add_argument(
         "--hdf5-path",
         type=Path,
         default=None,
         help="Path for HDF5 file (default: exports/data.h5)",
     )
+    p.add_argument(
+        "--stream",
+        action="store_true",
+        help="Memory-map .npy inputs and write text/HDF5 in row blocks so peak\n"
+        "memory stays constant (.npz members are still loaded whole)",
+    )
+    p.add_argument(
+        "--block-rows",
+        type=int,
+        default=65536,
+        help="Rows per block in --stream mode (default: 65536)",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Worker processes for reading and formatting (default: 1). Text is\n"
+        "written by the workers; HDF5 is written by this process in sorted\n"
+        "path order, so the file matches a serial run byte for byte",
+    )
+    p.add_argument(
+        "--compression",
+        choices=["none", "gzip", "lzf"],
+        default="none",
+        help="HDF5 compression filter (default: none)",
+    )
+    p.add_argument(
+        "--compression-level",
+        type=int,
+        choices=range(10),
+        default=4,
+        metavar="0-9",
+        help="gzip compression level (default: 4)",
+    )
+    p.add_argument(
+        "--shuffle",
+        action="store_true",
+        help="Apply the HDF5 byte-shuffle filter before compression",
+    )
+    p.add_argument(
+        "--chunks",
+        default="auto",
+        help="HDF5 chunk shape: 'auto' (whole rows, ~--chunk-kib per chunk),\n"
+        "'none' (contiguous, only without filters) or e.g. '1024,12'.\n"
+        "Shapes whose rank does not match an array fall back to auto (default: auto)",
+    )
+    p.add_argument(
+        "--chunk-kib",
+        type=int,
+        default=1024,
+        help="Target chunk size in KiB for --chunks auto (default: 1024)",
+    )
+    p.add_argument(
+        "--downcast",
+        choices=["float32", "float16"],
+        default=None,
+        help="Store float arrays with this dtype when it meets --downcast-tolerance",
+    )
+    p.add_argument(
+        "--downcast-tolerance",
+        type=float,
+        default=0.0,
+        help="Max relative error per element accepted by --downcast (default: 0,\n"
+        "i.e. only exactly representable arrays are downcast)",
+    )
+    p.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Keep a manifest (size, mtime, sha256) in --outdir, convert only new\n"
+        "or changed files, append to an existing HDF5 file, and remove the\n"
+        "exports of sources that no longer exist",
+    )
     args = p.parse_args()
 
+    if args.chunks == "auto":
+        chunks: Union[str, tuple[int, ...], None] = "auto"
+    elif args.chunks == "none":
+        chunks = None
+    else:
+        chunks = tuple(int(c) for c in args.chunks.split(","))
+    layout = HDF5Layout(
+        compression=None if args.compression == "none" else args.compression,
+        compression_level=args.compression_level,
+        shuffle=args.shuffle,
+        chunks=chunks,
+        chunk_bytes=args.chunk_kib * 1024,
+        downcast=args.downcast,
+        downcast_tolerance=args.downcast_tolerance,
+    )
+
     delimiter = {",": ",", "tab": "\t", "space": " "}[args.delimiter]
-    write_text = args.format in ("text", "both")
-    write_hdf5 = args.format in ("hdf5", "both")
+    formats = set(args.format)
+    write_text = bool(formats & {"text", "both"})
+    write_hdf5 = bool(formats & {"hdf5", "both"})
+    columnar_formats = tuple(fmt for fmt in COLUMNAR_FORMATS if fmt in formats)
+    if not HAVE_PYARROW and formats & {"parquet", "arrow"}:
+        raise SystemExit("pyarrow is not installed but --format includes parquet or arrow")
+    if not HAVE_ZARR and "zarr" in formats:
+        raise SystemExit("zarr is not installed but --format includes zarr")
 
     ensure_dir(args.outdir)
 
+    h5_path = args.hdf5_path or (args.outdir / "data.h5")
+    manifest_path = args.outdir / "manifest.json"
+    settings = {
+        "root": str(args.root.resolve()),
+        "format": sorted(formats),
+        "delimiter": delimiter,
+        "floatfmt": args.floatfmt,
+        "hdf5_path": str(h5_path),
+        "layout": list(layout),
+    }
+    settings = json.loads(json.dumps(settings))  # as it will read back from the manifest
+    manifest = {}
+    if args.incremental and (h5_path.exists() or not write_hdf5):
+        manifest = load_manifest(manifest_path, settings)
+
     h5: Optional["h5py.File"] = None
     if write_hdf5:
         if h5py is None:
             raise SystemExit("h5py is not installed but --format includes hdf5")
-        h5_path = args.hdf5_path or (args.outdir / "data.h5")
         ensure_dir(h5_path.parent)
-        h5 = h5py.File(h5_path, "w")
+        h5 = h5py.File(h5_path, "a" if manifest and h5_path.exists() else "w")
 
     try:
         files = sorted({Path(p) for p in iter_target_files(args.root, args.patterns)})
-        if not files:
+        files = [src for src in files if args.outdir not in src.parents]  # Skip writing into exports again
+        if not files and not manifest:
             print("No files matched; check --root and --patterns.")
             return
         print(f"Found {len(files)} file(s). Converting...")
-        for src in files:
-            # Skip writing into exports again
-            if args.outdir in src.parents:
-                continue
-            convert_file(
-                src_path=src,
+
+        entries = {}
+        if args.incremental:
+            to_convert = []
+            for src in files:
+                key = str(safe_relpath(src, args.root))
+                changed, stat = source_changed(src, manifest.get(key))
+                if changed or not all((args.outdir / rel).exists() for rel in manifest[key]["files"]):
+                    if key in manifest:
+                        remove_outputs(manifest[key], args.outdir, h5)
+                    to_convert.append(src)
+                    rel_parent = safe_relpath(src, args.root).parent
+                    group_path = hdf5_group_path(src, args.root)
+                    names = output_names(src)
+                    stat["files"] = [str(rel_parent / f"{n}.csv") for n in names] if write_text else []
+                    stat["files"] += [str(rel_parent / f"{n}{COLUMNAR_FORMATS[fmt]}")
+                                      for n in names for fmt in columnar_formats]
+                    stat["hdf5"] = [f"{group_path}/{n}" for n in names] if write_hdf5 else []
+                else:
+                    stat["files"], stat["hdf5"] = manifest[key]["files"], manifest[key]["hdf5"]
+                entries[key] = stat
+            for key in sorted(set(manifest) - set(entries)):
+                remove_outputs(manifest[key], args.outdir, h5)
+                print(f"Removed exports of deleted source: {key}")
+            print(f"{len(files) - len(to_convert)} unchanged file(s) skipped.")
+            files = to_convert
+
+        block_rows = args.block_rows if args.stream else None
+        hdf5_stats = (0, 0, 0.0)
+        if args.jobs <= 1:
+            for src in files:
+                written = convert_file(
+                    src_path=src,
+                    root=args.root,
+                    outdir=args.outdir,
+                    write_text=write_text,
+                    write_hdf5=write_hdf5,
+                    delimiter=delimiter,
+                    floatfmt=args.floatfmt,
+                    text_backend=args.text_backend,
+                    columnar_formats=columnar_formats,
+                    hdf5_file=h5,
+                    block_rows=block_rows,
+                    layout=layout,
+                )
+                hdf5_stats = tuple(a + b for a, b in zip(hdf5_stats, written))
+                print(f"Converted: {safe_relpath(src, args.root)}")
+        else:
+            # In --stream mode arrays are not shipped back from the workers;
+            # the writer memory-maps each source again instead.
+            collect_arrays = write_hdf5 and block_rows is None
+            worker = partial(
+                convert_file_in_worker,
                 root=args.root,
                 outdir=args.outdir,
                 write_text=write_text,
-                write_hdf5=write_hdf5,
+                collect_arrays=collect_arrays,
                 delimiter=delimiter,
                 floatfmt=args.floatfmt,
-                hdf5_file=h5,
+                block_rows=block_rows,
+                text_backend=args.text_backend,
+                columnar_formats=columnar_formats,
             )
-            print(f"Converted: {safe_relpath(src, args.root)}")
+            with ProcessPoolExecutor(max_workers=args.jobs) as pool:
+                # map() yields in submission order, i.e. sorted path order
+                for src, collected in zip(files, pool.map(worker, files)):
+                    if h5 is not None:
+                        if collect_arrays:
+                            for group_path, name, arr in collected:
+                                written = add_array_to_hdf5(h5, group_path, name, arr, layout=layout)
+                                hdf5_stats = tuple(a + b for a, b in zip(hdf5_stats, written))
+                        else:
+                            written = convert_file(
+                                src_path=src,
+                                root=args.root,
+                                outdir=args.outdir,
+                                write_text=False,
+                                write_hdf5=True,
+                                delimiter=delimiter,
+                                floatfmt=args.floatfmt,
+                                hdf5_file=h5,
+                                block_rows=block_rows,
+                                layout=layout,
+                            )
+                            hdf5_stats = tuple(a + b for a, b in zip(hdf5_stats, written))
+                    print(f"Converted: {safe_relpath(src, args.root)}")
+        if args.incremental:
+            save_manifest(manifest_path, settings, entries)
         print("Done.")
         if write_hdf5 and h5 is not None:
             print(f"HDF5 written to: {h5.filename}")
-        if write_text:
-            print(f"Text files written under: {args.outdir}")
+            raw_bytes, stored_bytes, seconds = hdf5_stats
+            ratio = raw_bytes / stored_bytes if stored_bytes else float("nan")
+            rate = raw_bytes / 2**20 / seconds if seconds > 0 else float("nan")
+            print(f"HDF5: {raw_bytes / 2**20:.2f} MiB in, {stored_bytes / 2**20:.2f} MiB stored "
+                  f"(compression ratio {ratio:.2f}), write throughput {rate:.1f} MiB/s")
+        if write_text or columnar_formats:
+            print(f"Text/columnar files written under: {args.outdir}")
     finally:
         if h5 is not None:
             h5.close()
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Batched Fisher-matrix glitch biases for many glitch backgrounds at once.
+
+For a glitch g the Fisher-matrix bias is
+
+    delta_theta = Gamma^{-1} (dh/dtheta | g),
+
+so with the inner products of every background stacked as rows of an
+(n_bg, 12) array X, all the biases are one Cholesky solve against the cached
+factor of the Jacobi-scaled Fisher matrix, Gamma = D (L L^T) D with
+D = diag(fisher_scale) (see fisher_cache.py),
+
+    delta_theta_arr^T = D^{-1} (L L^T)^{-1} D^{-1} X^T,   R_arr = |delta_theta_arr / SD_ii|.
+
+That is two triangular solves per chunk, never a product with the explicit
+inverse, so the ill-conditioning of Gamma is not squared into the biases.
+
+Rows are processed in chunks of ``chunk_rows`` read from a memory-mapped
+input and written straight into memory-mapped outputs, so memory use does
+not depend on the number of backgrounds. With ``jobs`` > 1 the chunks are
+shared between processes that each write their own rows. The outputs go to
+the usual ``{label}_delta_theta_arr.npy`` / ``{label}_R_arr.npy`` files of
+``data_files/EMRI_errors/max_glitch_SNR_{SNR}/``, replaced atomically once
+complete.
+
+The same solve turns per-glitch inner products into the per-glitch bias
+contributions of glitch_contributions.py (``--glitch-snr`` and ``--offsets``).
+
+Usage:
+    python fisher_bias.py Prograde_EMRI inner_products.npy --max-glitch-snr 90 --jobs 8
+    python fisher_bias.py Prograde_EMRI glitch_inner_products.npy --glitch-snr glitch_SNRs.npy --offsets offsets.npy
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+
+from EMRI_data import R_arr_file, delta_theta_arr_file, load_noise_model
+
+DEFAULT_CHUNK_ROWS = 65536
+
+
+def solve_biases(inner_products: np.ndarray, fisher_cholesky: np.ndarray, fisher_scale: np.ndarray) -> np.ndarray:
+    """Biases for stacked inner products X of shape (n, 12), D^{-1} (L L^T)^{-1} D^{-1} X^T transposed."""
+    from scipy.linalg import cho_solve
+
+    scaled = np.asarray(inner_products, dtype=np.float64)/fisher_scale
+    return cho_solve((fisher_cholesky, True), scaled.T).T/fisher_scale
+
+
+def _solve_rows(
+    src: str,
+    delta_theta_path: str,
+    R_path: str,
+    fisher_cholesky: np.ndarray,
+    fisher_scale: np.ndarray,
+    SD_ii: np.ndarray,
+    start: int,
+    stop: int,
+    chunk_rows: int,
+) -> int:
+    inner_products = np.load(src, mmap_mode="r")
+    delta_theta_out = np.load(delta_theta_path, mmap_mode="r+")
+    R_out = np.load(R_path, mmap_mode="r+")
+    for lo in range(start, stop, chunk_rows):
+        hi = min(lo + chunk_rows, stop)
+        delta_theta = solve_biases(inner_products[lo:hi], fisher_cholesky, fisher_scale)
+        delta_theta_out[lo:hi] = delta_theta
+        R_out[lo:hi] = np.abs(delta_theta/SD_ii)
+    delta_theta_out.flush()
+    R_out.flush()
+    return stop - start
+
+
+def write_bias_arrays(
+    label: str,
+    max_glitch_SNR: float,
+    inner_products_file: str | Path,
+    chunk_rows: int = DEFAULT_CHUNK_ROWS,
+    jobs: int = 1,
+    delta_theta_path: Optional[str | Path] = None,
+    R_path: Optional[str | Path] = None,
+) -> tuple[str, str]:
+    """Solve every background in ``inner_products_file`` and write delta_theta_arr and R_arr."""
+    model = load_noise_model(label)
+    inner_products = np.load(inner_products_file, mmap_mode="r")
+    if inner_products.ndim != 2 or inner_products.shape[1] != len(model.SD_ii):
+        raise ValueError(f"{inner_products_file}: expected (n_bg, {len(model.SD_ii)}) inner products, got {inner_products.shape}")
+    n_rows = inner_products.shape[0]
+    delta_theta_path = str(delta_theta_path or delta_theta_arr_file(label, max_glitch_SNR))
+    R_path = str(R_path or R_arr_file(label, max_glitch_SNR))
+    Path(delta_theta_path).parent.mkdir(parents=True, exist_ok=True)
+
+    tmp_paths = [f"{path}.{os.getpid()}.tmp.npy" for path in (delta_theta_path, R_path)]
+    for tmp in tmp_paths:
+        np.lib.format.open_memmap(tmp, mode="w+", dtype=np.float64, shape=inner_products.shape).flush()
+
+    args = (str(inner_products_file), *tmp_paths, model.fisher_cholesky, model.fisher_scale, model.SD_ii)
+    if jobs > 1 and n_rows > chunk_rows:
+        #Whole chunks per process, so every process writes disjoint rows
+        n_chunks = -(-n_rows // chunk_rows)
+        per_job = -(-n_chunks // jobs)*chunk_rows
+        ranges = [(lo, min(lo + per_job, n_rows)) for lo in range(0, n_rows, per_job)]
+        with ProcessPoolExecutor(max_workers=len(ranges)) as pool:
+            list(pool.map(_solve_rows, *zip(*[args + (lo, hi, chunk_rows) for lo, hi in ranges])))
+    else:
+        _solve_rows(*args, 0, n_rows, chunk_rows)
+
+    for tmp, path in zip(tmp_paths, (delta_theta_path, R_path)):
+        os.replace(tmp, path)
+    return delta_theta_path, R_path
+
+
+def write_glitch_contributions(
+    label: str,
+    glitch_inner_products: np.ndarray,
+    glitch_SNR: np.ndarray,
+    offsets: np.ndarray,
+):
+    """Per-glitch bias contributions for glitch_contributions.py; background b is rows offsets[b]:offsets[b+1]."""
+    from glitch_contributions import save_glitch_contributions
+
+    model = load_noise_model(label)
+    contributions = solve_biases(glitch_inner_products, model.fisher_cholesky, model.fisher_scale)
+    bounds = list(zip(offsets[:-1], offsets[1:]))
+    return save_glitch_contributions(
+        label,
+        [np.asarray(glitch_SNR[lo:hi]) for lo, hi in bounds],
+        [contributions[lo:hi] for lo, hi in bounds],
+    )
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("label", help="EMRI label, e.g. Prograde_EMRI")
+    p.add_argument("inner_products", type=Path, help=".npy of stacked (dh/dtheta | g) inner products, (n, 12)")
+    p.add_argument("--max-glitch-snr", type=float, default=np.inf, help="Output directory's SNR cut (default: inf)")
+    p.add_argument("--chunk-rows", type=int, default=DEFAULT_CHUNK_ROWS, help=f"Rows per chunk (default: {DEFAULT_CHUNK_ROWS})")
+    p.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    p.add_argument("--glitch-snr", type=Path, help="Rows are single glitches with these SNRs (.npy); write per-glitch contributions")
+    p.add_argument("--offsets", type=Path, help="With --glitch-snr: background b is rows offsets[b]:offsets[b+1] (.npy)")
+    args = p.parse_args()
+
+    t0 = time.perf_counter()
+    if args.glitch_snr is not None:
+        if args.offsets is None:
+            raise SystemExit("--glitch-snr needs --offsets")
+        contributions = write_glitch_contributions(
+            args.label,
+            np.load(args.inner_products, mmap_mode="r"),
+            np.load(args.glitch_snr, mmap_mode="r"),
+            np.load(args.offsets),
+        )
+        print(f"Stored contributions of {len(contributions.glitch_SNR)} glitches in "
+              f"{contributions.n_backgrounds} backgrounds in {time.perf_counter() - t0:.2f} s")
+        return
+    delta_theta_path, R_path = write_bias_arrays(
+        args.label, args.max_glitch_snr, args.inner_products, chunk_rows=args.chunk_rows, jobs=args.jobs
+    )
+    n_rows = np.load(delta_theta_path, mmap_mode="r").shape[0]
+    elapsed = time.perf_counter() - t0
+    print(f"Solved {n_rows} backgrounds in {elapsed:.2f} s ({n_rows/elapsed:.3g} per s)")
+    print(f"  {delta_theta_path}\n  {R_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+"""
+Persistent cache of the Fisher-derived noise model of each EMRI.
+
+For every ``Fisher_{label}.h5`` this stores the noise-induced covariance
+(the inverse Fisher matrix), its lower Cholesky factor, the Cholesky factor
+of the Jacobi-scaled Fisher matrix with its scale, ``SD_ii`` and the
+condition number of the Fisher matrix in ``cache/Fisher_{label}.{hash}.npz``
+next to the Fisher files. The hash is taken over the contents of the Fisher
+dataset, so an edited Fisher matrix gets a fresh artifact while an unchanged
+one is never refactorised.
+
+The covariance is obtained from a Cholesky solve of the Jacobi-scaled Fisher
+matrix (unit diagonal) rather than an explicit ``np.linalg.inv``: EMRI Fisher
+matrices span many orders of magnitude (M ~ 1e6 vs angles ~ 1) and the
+scaling removes most of that ill-conditioning before factorising. With
+fisher = D (L L^T) D, D = diag(fisher_scale), a bias Gamma^{-1} x is two
+triangular solves with ``fisher_cholesky`` (see fisher_bias.py).
+
+Noise-induced biases can be sampled directly from the factor,
+``rng.standard_normal((n, 12)) @ noise_cholesky.T``, without the SVD that
+``np.random.multivariate_normal`` redoes on every call.
+
+Usage:
+
+  - Build (or check) the artifacts for every Fisher matrix and print their
+    condition numbers:
+      python fisher_cache.py
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import os
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+CACHE_SUBDIR = "cache"
+
+
+class NoiseModel(NamedTuple):
+    fisher_hash: str
+    noise_covariance: np.ndarray
+    noise_cholesky: np.ndarray
+    fisher_cholesky: np.ndarray  # lower Cholesky factor of the Jacobi-scaled Fisher matrix
+    fisher_scale: np.ndarray  # sqrt(diag(fisher))
+    SD_ii: np.ndarray
+    condition_number: float
+    scaled_condition_number: float
+
+
+def read_fisher(fisher_file: str | Path) -> np.ndarray:
+    from h5py import File
+
+    with File(fisher_file, "r") as f:
+        return np.array(f['Fisher'][()])
+
+
+def fisher_hash(fisher: np.ndarray) -> str:
+    fisher = np.ascontiguousarray(fisher)
+    h = hashlib.sha256()
+    h.update(f"{fisher.dtype.str}{fisher.shape}".encode())
+    h.update(fisher.tobytes())
+    return h.hexdigest()
+
+
+def compute_noise_model(fisher: np.ndarray) -> NoiseModel:
+    """Factorise a Fisher matrix; raises ``np.linalg.LinAlgError`` if it is not positive definite."""
+    fisher = np.asarray(fisher, dtype=np.float64)
+    n = fisher.shape[0]
+    #Jacobi scaling: fisher = D scaled D with D = sqrt(diag(fisher))
+    d = np.sqrt(np.diag(fisher))
+    scaled = fisher/np.outer(d, d)
+    L = np.linalg.cholesky(scaled)
+    L_inv = np.linalg.solve(L, np.eye(n))
+    scaled_covariance = L_inv.T @ L_inv
+    scaled_covariance = 0.5*(scaled_covariance + scaled_covariance.T)
+    noise_covariance = scaled_covariance/np.outer(d, d)
+    noise_cholesky = np.linalg.cholesky(scaled_covariance)/d[:, None]
+    SD_ii = np.sqrt(np.diag(scaled_covariance))/d
+    return NoiseModel(
+        fisher_hash=fisher_hash(fisher),
+        noise_covariance=noise_covariance,
+        noise_cholesky=noise_cholesky,
+        fisher_cholesky=L,
+        fisher_scale=d,
+        SD_ii=SD_ii,
+        condition_number=float(np.linalg.cond(fisher)),
+        scaled_condition_number=float(np.linalg.cond(scaled)),
+    )
+
+
+def cache_path(fisher_file: str | Path, digest: str) -> Path:
+    fisher_file = Path(fisher_file)
+    return fisher_file.parent / CACHE_SUBDIR / f"{fisher_file.stem}.{digest[:16]}.npz"
+
+
+def _load_artifact(path: Path) -> NoiseModel:
+    with np.load(path, allow_pickle=False) as npz:
+        return NoiseModel(
+            fisher_hash=str(npz["fisher_hash"]),
+            noise_covariance=npz["noise_covariance"],
+            noise_cholesky=npz["noise_cholesky"],
+            fisher_cholesky=npz["fisher_cholesky"],
+            fisher_scale=npz["fisher_scale"],
+            SD_ii=npz["SD_ii"],
+            condition_number=float(npz["condition_number"]),
+            scaled_condition_number=float(npz["scaled_condition_number"]),
+        )
+
+
+def _save_artifact(path: Path, model: NoiseModel) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        np.savez(f, **model._asdict())
+    os.replace(tmp, path)
+
+
+def load_noise_model(fisher_file: str | Path) -> NoiseModel:
+    """Noise model for a Fisher file, read from its cached artifact or built and cached."""
+    fisher = read_fisher(fisher_file)
+    digest = fisher_hash(fisher)
+    path = cache_path(fisher_file, digest)
+    if path.exists():
+        try:
+            model = _load_artifact(path)
+        except KeyError:
+            #Artifact written before a field was added; rebuild it
+            model = None
+        if model is not None and model.fisher_hash == digest:
+            return model
+    model = compute_noise_model(fisher)
+    _save_artifact(path, model)
+    return model
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument(
+        "--fisher-dir",
+        type=Path,
+        default=Path("data_files/EMRI_fisher"),
+        help="Directory holding the Fisher_{label}.h5 files (default: data_files/EMRI_fisher)",
+    )
+    args = p.parse_args()
+
+    fisher_files = sorted(args.fisher_dir.glob("Fisher_*.h5"))
+    if not fisher_files:
+        raise SystemExit(f"No Fisher_*.h5 files found in {args.fisher_dir}")
+    for fisher_file in fisher_files:
+        model = load_noise_model(fisher_file)
+        print(f"{fisher_file.name}: hash {model.fisher_hash[:16]}, "
+              f"cond(F) = {model.condition_number:.3e}, "
+              f"cond(scaled F) = {model.scaled_condition_number:.3e}")
+
+
+if __name__ == "__main__":
+    main()
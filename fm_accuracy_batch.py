@@ -0,0 +1,180 @@
+#!/usr/bin/env python3
+"""
+Compare the Fisher-matrix glitch biases with the MCMC ones for every glitch
+background, EMRI and max glitch SNR at once.
+
+accuracy_of_errors_fig.py looks at a single background of a single EMRI. This
+finds every ``BG_{idx}_PLUS_{samples file}.h5`` chain under
+``data_files/EMRI_mcmc_samples/max_glitch_SNR_{SNR}/``, and for each computes
+the same relative error,
+
+    |delta_theta_FM - delta_theta_MCMC| / SD_ii,
+
+in a process pool. The results are saved as one structured array with one row
+per (EMRI, max glitch SNR, background) and one float column per parameter
+(see param_names in EMRI_settings.py).
+
+Chain reductions go through mcmc_chains.load_chain_summary, so re-runs only
+read chains that changed. With ``--burnin auto`` each chain is instead streamed
+through chain_stats.summarise_chain and its suggested burn-in is used.
+
+Usage:
+
+  - All EMRIs and SNR cuts on 16 cores:
+      python fm_accuracy_batch.py --jobs 16
+
+  - One EMRI, two cuts:
+      python fm_accuracy_batch.py --emri Prograde_EMRI --max-glitch-snr inf 8.0
+
+  - Burn-in picked per chain:
+      python fm_accuracy_batch.py --burnin auto
+"""
+
+from __future__ import annotations
+
+import argparse
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterable, NamedTuple, Optional, Union
+
+import numpy as np
+
+from EMRI_settings import EMRI_registry, param_names
+from EMRI_data import load_delta_theta_arr, load_noise_covariance
+from chain_stats import summarise_chain
+from mcmc_chains import load_chain_summary, load_true_vals
+
+samples_root = Path("data_files/EMRI_mcmc_samples")
+default_max_glitch_SNR = [np.inf, 400.0, 90.0, 8.0]
+default_EMRIs = list(EMRI_registry)
+
+glitchy_burnin = 2000
+
+RESULT_DTYPE = np.dtype(
+    [("EMRI", "U32"), ("max_glitch_SNR", "f8"), ("glitch_bg_idx", "i8")]
+    + [(name, "f8") for name in param_names]
+)
+
+_BG_PATTERN = re.compile(r"^BG_(\d+)_PLUS_(.+_M-.+\.h5)$")
+
+
+class ChainTask(NamedTuple):
+    label: str
+    max_glitch_SNR: float
+    glitch_bg_idx: int
+    chain_file: Path
+    params_file: Path
+
+
+def find_chain_tasks(
+    labels: Iterable[str],
+    max_glitch_SNR: Iterable[float],
+    root: Path = samples_root,
+) -> list[ChainTask]:
+    labels = set(labels)
+    tasks = []
+    for SNR in max_glitch_SNR:
+        glitchy_samples_dir = root / f"max_glitch_SNR_{float(SNR)}"
+        for chain_file in sorted(glitchy_samples_dir.glob("BG_*_PLUS_*.h5")):
+            match = _BG_PATTERN.match(chain_file.name)
+            if match is None:
+                continue
+            samples_filename = match.group(2)
+            label = samples_filename.split("_M-")[0]
+            if label not in labels:
+                continue
+            params_file = root / "max_glitch_SNR_inf" / f"PARAMS_{samples_filename}"
+            tasks.append(ChainTask(label, float(SNR), int(match.group(1)), chain_file, params_file))
+    return tasks
+
+
+def relative_error(task: ChainTask, burnin: Union[int, str] = glitchy_burnin) -> np.ndarray:
+    """|delta_theta_FM - delta_theta_MCMC| / SD_ii for one glitchy chain, MCMC from the cold chain.
+
+    ``burnin="auto"`` uses the burn-in suggested by chain_stats.summarise_chain.
+    """
+    noise_covariance, SD_ii = load_noise_covariance(task.label)
+    true_vals = load_true_vals(task.params_file)
+    if burnin == "auto":
+        posterior_mean = summarise_chain(task.chain_file, temp=0).mean
+    else:
+        posterior_mean = load_chain_summary(task.chain_file, discard=burnin).means[0]
+    delta_theta_MCMC = posterior_mean - true_vals
+    delta_theta_FM = load_delta_theta_arr(task.label, task.max_glitch_SNR)[task.glitch_bg_idx]
+    return np.abs((delta_theta_FM - delta_theta_MCMC)/SD_ii)
+
+
+def _run_task(task: ChainTask, burnin: Union[int, str]) -> tuple[ChainTask, Optional[np.ndarray], Optional[str]]:
+    try:
+        return task, relative_error(task, burnin), None
+    except Exception as exc:
+        return task, None, f"{type(exc).__name__}: {exc}"
+
+
+def compare_all(tasks: list[ChainTask], jobs: int = 1, burnin: Union[int, str] = glitchy_burnin) -> tuple[np.ndarray, list]:
+    """Relative errors for every task as a RESULT_DTYPE table, plus (task, error message) failures."""
+    if jobs > 1:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = list(pool.map(_run_task, tasks, [burnin]*len(tasks), chunksize=max(1, len(tasks)//(4*jobs))))
+    else:
+        results = [_run_task(task, burnin) for task in tasks]
+
+    ok = [(task, rel) for task, rel, err in results if err is None]
+    table = np.zeros(len(ok), dtype=RESULT_DTYPE)
+    for row, (task, rel) in zip(table, ok):
+        row["EMRI"] = task.label
+        row["max_glitch_SNR"] = task.max_glitch_SNR
+        row["glitch_bg_idx"] = task.glitch_bg_idx
+        for name, value in zip(param_names, rel):
+            row[name] = value
+    failures = [(task, err) for task, rel, err in results if err is not None]
+    return table, failures
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--emri", nargs="+", default=default_EMRIs, help="EMRI labels (default: every registered EMRI)")
+    p.add_argument(
+        "--max-glitch-snr",
+        nargs="+",
+        type=float,
+        default=default_max_glitch_SNR,
+        help="Max glitch SNR cuts (default: inf 400 90 8)",
+    )
+    p.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    p.add_argument(
+        "--burnin",
+        type=lambda v: v if v == "auto" else int(v),
+        default=glitchy_burnin,
+        help=f"Steps discarded, or 'auto' to use chain_stats' suggestion (default: {glitchy_burnin})",
+    )
+    p.add_argument("--samples-root", type=Path, default=samples_root)
+    p.add_argument(
+        "--output",
+        type=Path,
+        default=Path("FM_vs_MCMC_relative_errors.npy"),
+        help="Structured .npy table to write (default: FM_vs_MCMC_relative_errors.npy)",
+    )
+    args = p.parse_args()
+
+    tasks = find_chain_tasks(args.emri, args.max_glitch_snr, args.samples_root)
+    if not tasks:
+        raise SystemExit(f"No BG_*_PLUS_*.h5 chains found under {args.samples_root}")
+    print(f"Comparing {len(tasks)} glitchy chain(s)...")
+    table, failures = compare_all(tasks, jobs=args.jobs, burnin=args.burnin)
+    np.save(args.output, table)
+    print(f"Wrote {len(table)} row(s) to {args.output}")
+    for label in np.unique(table["EMRI"]):
+        rows = table[table["EMRI"] == label]
+        worst = np.max([rows[name] for name in param_names], axis=0)
+        print(f"  {label}: median worst-parameter relative error {np.median(worst):.3g} over {len(rows)} row(s)")
+    if failures:
+        for task, err in failures:
+            print(f"FAILED {task.chain_file}: {err}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,8 +1,9 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from h5py import File
-from sklearn.utils import resample
-from EMRI_settings import *
+from EMRI_settings import ProgradeEMRI, param_labels
+from plotting import pyplot
+from EMRI_data import delta_theta_arr_file, fisher_file, load_noise_covariance
+from glitch_contributions import contributions_files, bias_moments, has_glitch_contributions, load_glitch_contributions, normalised_bias_curve
+from R_summaries import load_R_summary
 
 #Choose an EMRI
 fiducial_EMRI = ProgradeEMRI()
@@ -10,63 +11,67 @@ fiducial_EMRI = ProgradeEMRI()
 # Choose the levels of glitch mitigation we want to consider
 max_glitch_SNR = [np.inf, 400.0, 90.0, 8.0]#
 
-#FM dir and filename
-fisher_dir= "data_files/EMRI_fisher/"
-fisher_fname= f"Fisher_{fiducial_EMRI.label}.h5"
-fisher_file= fisher_dir+fisher_fname
+#Max glitch SNRs for the continuous curves (only made when per-glitch bias contributions are stored)
+threshold_grid = np.logspace(0, 4, 200)
 
-#Load EMRI params
-M, mu, a, p0, e0, x0, dist, qS, phiS, qK, phiK, Phi_phi0, Phi_theta0, Phi_r0 = (fiducial_EMRI.M,
-                                                                                    fiducial_EMRI.mu,
-                                                                                        fiducial_EMRI.a,
-                                                                                        fiducial_EMRI.p0,
-                                                                                            fiducial_EMRI.e0,
-                                                                                            fiducial_EMRI.x0,
-                                                                                                fiducial_EMRI.dist,
-                                                                                                fiducial_EMRI.qS,
-                                                                                                    fiducial_EMRI.phiS,
-                                                                                                    fiducial_EMRI.qK,
-                                                                                                        fiducial_EMRI.phiK,
-                                                                                                        fiducial_EMRI.Phi_phi0,
-                                                                                                            fiducial_EMRI.Phi_theta0,
-                                                                                                            fiducial_EMRI.Phi_r0)
 
-#Omitting the params that we don't estimate!
-params = [M, mu, a, p0, e0, dist, qS, phiS, qK, phiK, Phi_phi0, Phi_r0]#x0, Phi_theta0,
+def main(fiducial_EMRI=fiducial_EMRI, max_glitch_SNR=max_glitch_SNR, output_path=None):
+    plt = pyplot()
+    #Iterate plotting of total biases over various glitch mitigation levels
+    plt.figure()
+    # plt.title(f"{fiducial_EMRI.label}\n Absolute glitch biases normalised by noise-induced uncertainty")
+    for SNR in max_glitch_SNR:
+        #Total bias: E(noise biases + glitch biases) = E(glitch biases), in magnitude and
+        #normalised by the noise-induced uncertainty; precomputed in R_summaries.py
+        normalised_total_bias= load_R_summary(fiducial_EMRI.label, SNR).normalised_total_bias
+        x_coords = np.arange(0,len(normalised_total_bias))
+        #Scatter plot the normalised biases
+        plt.scatter(x_coords, normalised_total_bias, marker=".", label=f"Glitch SNRs $\\leq$ {SNR}", zorder=2)
 
-#Define all param names, labels and units
-param_names = ['M','mu','a','p0','e0','dist', 'qS','phiS','qK','phiK','Phi_phi0','Phi_r0']#'Y0', 'Phi_theta0',
-param_labels = ['$M$','$\\mu$','$a$','$p_0$','$e_0$','$d_L$', '$\\theta_S$','$\\phi_S$','$\\theta_K$','$\\phi_K$','$\\Phi_{\\phi_0}$','$\\Phi_{r_0}$']#'$Y_0$', '$\\Phi_{\\theta_0}$',
-params_units = ['$M_\\odot$', '$M_\\odot$','','','','Gpc', 'rad','rad','rad','rad','rad','rad']#'', 'rad'
+    plt.xticks(x_coords, param_labels)
+    plt.grid(axis="x", zorder=1)
+    plt.yscale("log")
+    plt.legend()
+    plt.ylabel("$|\\beta_{\\text{glitches}}|$ / SD($\Delta \\theta_{\\text{noise}})$")
+    plt.xlabel("Parameter")
+    plt.savefig(output_path or outputs(fiducial_EMRI)[0])
+    plt.close()
 
-#Load FM and calculate noise-induced covariance
-with File(fisher_file,"r") as f:
-    fisher= np.array(f['Fisher'][()])
+    #Continuous version: total biases against the max glitch SNR, from the per-glitch bias contributions
+    if has_glitch_contributions(fiducial_EMRI.label):
+        _, SD_ii = load_noise_covariance(fiducial_EMRI.label)
+        curves = normalised_bias_curve(bias_moments(load_glitch_contributions(fiducial_EMRI.label), threshold_grid), SD_ii)
+        plt.figure()
+        for k in range(curves.shape[1]):
+            plt.plot(threshold_grid, curves[:, k], label=param_labels[k])
+        for SNR in max_glitch_SNR:
+            if np.isfinite(SNR):
+                plt.axvline(SNR, linestyle="--", color="grey", zorder=1)
+        plt.xscale("log")
+        plt.yscale("log")
+        plt.legend(ncol=2, fontsize="small")
+        plt.ylabel("$|\\beta_{\\text{glitches}}|$ / SD($\Delta \\theta_{\\text{noise}})$")
+        plt.xlabel("Max glitch SNR")
+        plt.savefig(curve_output(output_path or outputs(fiducial_EMRI)[0]))
+        plt.close()
 
-noise_covariance= np.linalg.inv(fisher)
-noise_covariance_ii= np.diag(noise_covariance)
-SD_ii = noise_covariance_ii**0.5
 
-#Iterate plotting of total biases over various glitch mitigation levels
-plt.figure()
-# plt.title(f"{fiducial_EMRI.label}\n Absolute glitch biases normalised by noise-induced uncertainty")
-for SNR in max_glitch_SNR:
-    #Load EMRI biases
-    EMRI_biases_dir = f"/fred/oz303/aboumerd/EMRI_Glitches/data_files/EMRI_biases/max_glitch_SNR_{SNR}/"
-    delta_theta_arr_file= EMRI_biases_dir + f"{fiducial_EMRI.label}_delta_theta_arr.npy"
-    delta_theta_glitches= np.load(delta_theta_arr_file)
-    #Calculate total bias: E(noise biases + glitch biases) = E(glitch biases)
-    total_bias = np.mean(delta_theta_glitches, axis=0)
-    #Take the magnitude of the bias, normalise by the noise-induced uncertainty
-    normalised_total_bias= np.abs(total_bias/SD_ii)
-    x_coords = np.arange(0,len(normalised_total_bias))
-    #Scatter plot the normalised biases
-    plt.scatter(x_coords, normalised_total_bias, marker=".", label=f"Glitch SNRs $\\leq$ {SNR}", zorder=2)
+def inputs(fiducial_EMRI=fiducial_EMRI, max_glitch_SNR=max_glitch_SNR):
+    #Files read by main(), for run_figures.py
+    files = [fisher_file(fiducial_EMRI.label)] + [delta_theta_arr_file(fiducial_EMRI.label, SNR) for SNR in max_glitch_SNR]
+    if has_glitch_contributions(fiducial_EMRI.label):
+        files += contributions_files(fiducial_EMRI.label)
+    return files
 
-plt.xticks(x_coords, param_labels)
-plt.grid(axis="x", zorder=1)
-plt.yscale("log")
-plt.legend()
-plt.ylabel("$|\\beta_{\\text{glitches}}|$ / SD($\Delta \\theta_{\\text{noise}})$")
-plt.xlabel("Parameter")
-plt.savefig(f"{fiducial_EMRI.label}_glitch_biases.pdf")
\ No newline at end of file
+
+def curve_output(path):
+    return path.removesuffix(".pdf") + "_vs_max_SNR.pdf"
+
+
+def outputs(fiducial_EMRI=fiducial_EMRI):
+    path = f"{fiducial_EMRI.label}_glitch_biases.pdf"
+    return [path, curve_output(path)] if has_glitch_contributions(fiducial_EMRI.label) else [path]
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Per-glitch bias contributions and glitch-mitigation threshold queries.
+
+The Fisher-matrix bias is linear in the glitch signal, so the bias a glitch
+background causes is the sum of the biases of its glitches. With every
+glitch's contribution tagged by its SNR, the bias for any max glitch SNR
+cut follows without regenerating anything. Each background's glitches are
+sorted by SNR with cumulative sums kept, so for a cut S the bias is the
+cumulative sum up to the last glitch with SNR <= S, found by binary search
+(``delta_theta_at``, O(log n) per background).
+The figures only need the mean and variance over the backgrounds.
+``bias_moments`` gets these for a whole grid of cuts in O(n_glitches).
+
+Per EMRI the store is a directory of .npy files, memory-mapped on load:
+
+    data_files/EMRI_errors/glitch_contributions/{label}/
+        offsets.npy          (n_bg + 1,)          background b is rows offsets[b]:offsets[b+1]
+        glitch_SNR.npy       (n_glitches,)        sorted ascending within each background
+        cumulative_bias.npy  (n_glitches, 12)     running sum of the contributions within each background
+
+Backgrounds are in the row order of the max_glitch_SNR_inf delta_theta array,
+so with no cut the store reproduces it (see ``--check``).
+
+Example:
+
+    from glitch_contributions import bias_moments, delta_theta_at, load_glitch_contributions
+    contributions = load_glitch_contributions("Prograde_EMRI")
+    delta_theta_glitches = delta_theta_at(contributions, 50.0)  # (n_bg, 12)
+    moments = bias_moments(contributions, np.logspace(0, 4, 200))  # mean and var, (200, 12) each
+
+Usage:
+    python glitch_contributions.py Prograde_EMRI --max-glitch-snr 8 50 400
+    python glitch_contributions.py Prograde_EMRI --check
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+from pathlib import Path
+from typing import NamedTuple, Optional, Sequence
+
+import numpy as np
+
+contributions_root = "data_files/EMRI_errors/glitch_contributions/"
+STORE_FILES = ("offsets.npy", "glitch_SNR.npy", "cumulative_bias.npy")
+
+
+class GlitchContributions(NamedTuple):
+    offsets: np.ndarray
+    glitch_SNR: np.ndarray
+    cumulative_bias: np.ndarray
+
+    @property
+    def n_backgrounds(self) -> int:
+        return len(self.offsets) - 1
+
+
+def contributions_dir(label: str) -> Path:
+    return Path(contributions_root) / label
+
+
+def contributions_files(label: str) -> list[str]:
+    return [str(contributions_dir(label) / name) for name in STORE_FILES]
+
+
+def _save_npy(path: Path, arr: np.ndarray) -> None:
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        np.save(f, arr)
+    os.replace(tmp, path)
+
+
+def save_glitch_contributions(
+    label: str,
+    glitch_SNRs: Sequence[np.ndarray],
+    contributions: Sequence[np.ndarray],
+) -> GlitchContributions:
+    """Store per-background glitch SNRs (n_g,) and bias contributions (n_g, 12)."""
+    if len(glitch_SNRs) != len(contributions):
+        raise ValueError(f"{len(glitch_SNRs)} SNR arrays for {len(contributions)} contribution arrays")
+    counts = np.array([len(SNRs) for SNRs in glitch_SNRs], dtype=np.int64)
+    offsets = np.concatenate([[0], np.cumsum(counts)])
+    n_params = contributions[0].shape[1] if len(contributions) else 0
+    glitch_SNR = np.empty(offsets[-1])
+    cumulative_bias = np.empty((offsets[-1], n_params))
+    for b, (SNRs, contribution) in enumerate(zip(glitch_SNRs, contributions)):
+        if contribution.shape != (len(SNRs), n_params):
+            raise ValueError(f"background {b}: contributions of shape {contribution.shape} for {len(SNRs)} glitches")
+        order = np.argsort(SNRs, kind="stable")
+        rows = slice(offsets[b], offsets[b + 1])
+        glitch_SNR[rows] = SNRs[order]
+        np.cumsum(contribution[order], axis=0, out=cumulative_bias[rows])
+
+    directory = contributions_dir(label)
+    directory.mkdir(parents=True, exist_ok=True)
+    for name, arr in zip(STORE_FILES, (offsets, glitch_SNR, cumulative_bias)):
+        _save_npy(directory / name, arr)
+    return GlitchContributions(offsets, glitch_SNR, cumulative_bias)
+
+
+def load_glitch_contributions(label: str, mmap_mode: Optional[str] = "r") -> GlitchContributions:
+    return GlitchContributions(*(np.load(path, mmap_mode=mmap_mode) for path in contributions_files(label)))
+
+
+def has_glitch_contributions(label: str) -> bool:
+    return all(os.path.exists(path) for path in contributions_files(label))
+
+
+class BiasMoments(NamedTuple):
+    mean: np.ndarray  # (n_cuts, 12) mean glitch-induced bias over the backgrounds
+    var: np.ndarray  # (n_cuts, 12) its variance over the backgrounds (ddof=0)
+
+
+def bias_moments(contributions: GlitchContributions, max_glitch_SNRs: Sequence[float]) -> BiasMoments:
+    """Mean and variance over the backgrounds of the glitch-induced biases, for each cut.
+
+    Glitches with SNR <= the cut are kept. A glitch enters at the first cut
+    at or above its SNR, found with one searchsorted over all glitches. Per
+    cut, the sum and sum of squares of the background biases then change by
+    its contribution and by the change in its background's squared running sum.
+    So all cuts cost O(n_glitches) with no per-background loop and no
+    (n_cuts, n_bg, 12) array.
+    """
+    cuts = np.asarray(max_glitch_SNRs, dtype=np.float64)
+    order = np.argsort(cuts, kind="stable")
+    n_cuts, n_bg = len(cuts), contributions.n_backgrounds
+    cumulative = np.asarray(contributions.cumulative_bias)
+    n_params = cumulative.shape[1]
+    #Running sum before each glitch within its background (zero for the first glitch)
+    previous = np.empty_like(cumulative)
+    previous[1:] = cumulative[:-1]
+    starts = contributions.offsets[:-1][np.diff(contributions.offsets) > 0]
+    previous[starts] = 0
+    #Index of the first sorted cut that keeps each glitch (n_cuts: never kept)
+    enters = np.searchsorted(cuts[order], contributions.glitch_SNR, side="left")
+    sums = np.empty((n_cuts + 1, n_params))
+    sum_squares = np.empty((n_cuts + 1, n_params))
+    for k in range(n_params):
+        sums[:, k] = np.bincount(enters, weights=cumulative[:, k] - previous[:, k], minlength=n_cuts + 1)
+        sum_squares[:, k] = np.bincount(enters, weights=cumulative[:, k]**2 - previous[:, k]**2, minlength=n_cuts + 1)
+    mean = np.cumsum(sums[:n_cuts], axis=0)/n_bg
+    var = np.maximum(np.cumsum(sum_squares[:n_cuts], axis=0)/n_bg - mean**2, 0)
+    inverse = np.empty_like(order)
+    inverse[order] = np.arange(n_cuts)
+    return BiasMoments(mean[inverse], var[inverse])
+
+
+def delta_theta_at(contributions: GlitchContributions, max_glitch_SNR: float) -> np.ndarray:
+    """Glitch-induced biases of every background for one cut, shape (n_bg, 12).
+
+    Glitches are sorted by SNR within each background, so the kept ones are a
+    prefix, found by a binary search of each background's slice
+    [offsets[b], offsets[b+1]). The searches run side by side, one step for
+    all backgrounds at a time, so a cut costs O(n_bg log(max glitches per
+    background)) and reads only the probed SNRs, not every glitch.
+    """
+    offsets = np.asarray(contributions.offsets, dtype=np.int64)
+    SNR = contributions.glitch_SNR
+    #Invariant: the first glitch above the cut is in [lo, hi]
+    lo, hi = offsets[:-1].copy(), offsets[1:].copy()
+    searching = np.flatnonzero(lo < hi)
+    while len(searching):
+        mid = (lo[searching] + hi[searching])//2
+        kept = SNR[mid] <= max_glitch_SNR
+        lo[searching] = np.where(kept, mid + 1, lo[searching])
+        hi[searching] = np.where(kept, hi[searching], mid)
+        searching = searching[lo[searching] < hi[searching]]
+    out = np.zeros((contributions.n_backgrounds, contributions.cumulative_bias.shape[1]))
+    nonzero = lo > offsets[:-1]
+    out[nonzero] = contributions.cumulative_bias[lo[nonzero] - 1]
+    return out
+
+
+def normalised_bias_curve(moments: BiasMoments, SD_ii: np.ndarray) -> np.ndarray:
+    """|E(glitch biases)| / SD_ii for each cut, shape (n_cuts, 12)."""
+    return np.abs(moments.mean/SD_ii)
+
+
+def normalised_precision_curve(moments: BiasMoments, SD_ii: np.ndarray) -> np.ndarray:
+    """SD(glitch + noise biases) / SD_ii for each cut, shape (n_cuts, 12).
+
+    Glitch and noise biases are independent, so their variances add; this is
+    the statistic glitch_precisions_fig.py bootstraps over the backgrounds.
+    """
+    return np.sqrt(1 + moments.var/SD_ii**2)
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("label", help="EMRI label, e.g. Prograde_EMRI")
+    p.add_argument("--max-glitch-snr", nargs="+", type=float, default=[np.inf, 400.0, 90.0, 8.0])
+    p.add_argument("--check", action="store_true", help="Compare the uncut sums with the max_glitch_SNR_inf delta_theta array")
+    args = p.parse_args()
+
+    from EMRI_data import load_delta_theta_arr, load_noise_covariance
+    from EMRI_settings import param_names
+
+    contributions = load_glitch_contributions(args.label)
+    if args.check:
+        expected = load_delta_theta_arr(args.label, np.inf)
+        stored = delta_theta_at(contributions, np.inf)
+        if stored.shape != expected.shape:
+            sys.exit(f"store has {stored.shape}, delta_theta array {expected.shape}")
+        scale = np.max(np.abs(expected), axis=0)
+        rel = np.max(np.abs(stored - expected), axis=0)/np.where(scale > 0, scale, 1)
+        print(f"max relative difference per param: {np.array2string(rel, precision=2)}")
+        sys.exit(0 if np.all(rel < 1e-10) else 1)
+
+    _, SD_ii = load_noise_covariance(args.label)
+    moments = bias_moments(contributions, args.max_glitch_snr)
+    bias = normalised_bias_curve(moments, SD_ii)
+    precision = normalised_precision_curve(moments, SD_ii)
+    print(f"{contributions.n_backgrounds} backgrounds, {len(contributions.glitch_SNR)} glitches")
+    print(f"{'max SNR':>8s} {'param':<10s} {'|bias|/SD':>10s} {'SD/SD_noise':>12s}")
+    for SNR, bias_row, precision_row in zip(args.max_glitch_snr, bias, precision):
+        for name, b, s in zip(param_names, bias_row, precision_row):
+            print(f"{SNR:8g} {name:<10s} {b:10.4g} {s:12.4g}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,16 @@
 import numpy as np
-import matplotlib.pyplot as plt
-from h5py import File
-from sklearn.utils import resample
-from EMRI_settings import *
+from EMRI_settings import ProgradeEMRI, param_labels
+from plotting import pyplot
+from EMRI_data import load_delta_theta_arr, load_noise_model, delta_theta_arr_file, fisher_file
+from bootstrap import bootstrap_total_precision
+from glitch_contributions import contributions_files, bias_moments, has_glitch_contributions, load_glitch_contributions, normalised_precision_curve
 
 #Set a random seed
 seed=1234
-np.random.seed(seed)
+
+#Number of bootstrap resamples of the glitch backgrounds, and the width of the plotted interval
+n_boot=200
+confidence=0.9
 
 #Choose an EMRI
 fiducial_EMRI = ProgradeEMRI()
@@ -14,70 +18,74 @@ fiducial_EMRI = ProgradeEMRI()
 # Choose the levels of glitch mitigation we want to consider
 max_glitch_SNR = [np.inf, 400.0, 90.0, 8.0]#
 
-#FM dir and filename
-fisher_dir= "data_files/EMRI_fisher/"
-fisher_fname= f"Fisher_{fiducial_EMRI.label}.h5"
-fisher_file= fisher_dir+fisher_fname
-
-#Load EMRI params
-M, mu, a, p0, e0, x0, dist, qS, phiS, qK, phiK, Phi_phi0, Phi_theta0, Phi_r0 = (fiducial_EMRI.M,
-                                                                                    fiducial_EMRI.mu,
-                                                                                        fiducial_EMRI.a,
-                                                                                        fiducial_EMRI.p0,
-                                                                                            fiducial_EMRI.e0,
-                                                                                            fiducial_EMRI.x0,
-                                                                                                fiducial_EMRI.dist,
-                                                                                                fiducial_EMRI.qS,
-                                                                                                    fiducial_EMRI.phiS,
-                                                                                                    fiducial_EMRI.qK,
-                                                                                                        fiducial_EMRI.phiK,
-                                                                                                        fiducial_EMRI.Phi_phi0,
-                                                                                                            fiducial_EMRI.Phi_theta0,
-                                                                                                            fiducial_EMRI.Phi_r0)
-
-#Omitting the params that we don't estimate!
-params = [M, mu, a, p0, e0, dist, qS, phiS, qK, phiK, Phi_phi0, Phi_r0]#x0, Phi_theta0,
-
-#Define all param names, labels and units
-param_names = ['M','mu','a','p0','e0','dist', 'qS','phiS','qK','phiK','Phi_phi0','Phi_r0']#'Y0', 'Phi_theta0',
-param_labels = ['$M$','$\\mu$','$a$','$p_0$','$e_0$','$d_L$', '$\\theta_S$','$\\phi_S$','$\\theta_K$','$\\phi_K$','$\\Phi_{\\phi_0}$','$\\Phi_{r_0}$']#'$Y_0$', '$\\Phi_{\\theta_0}$',
-params_units = ['$M_\\odot$', '$M_\\odot$','','','','Gpc', 'rad','rad','rad','rad','rad','rad']#'', 'rad'
-
-#Load FM and calculate noise-induced covariance
-with File(fisher_file,"r") as f:
-    fisher= np.array(f['Fisher'][()])
-
-noise_covariance= np.linalg.inv(fisher)
-noise_covariance_ii= np.diag(noise_covariance)
-SD_ii = noise_covariance_ii**0.5
-
-#Generate samples of noise-induced biases using the FM-derived covariance
-delta_theta_noise = np.random.multivariate_normal(np.zeros(12), noise_covariance, 10000)
-
-#Iterate plotting of total precisions over various glitch mitigation levels
-plot_dir= f"data_files/EMRI_errors/max_glitch_SNR_inf/"
-plt.figure()
-# plt.title(f"{fiducial_EMRI.label}\n Uncertainty ratios for many glitch+noise backgrounds")
-for SNR in max_glitch_SNR:
-    #Load EMRI biases
-    EMRI_errors_dir = f"data_files/EMRI_errors/max_glitch_SNR_{SNR}/"
-    delta_theta_arr_file= EMRI_errors_dir + f"{fiducial_EMRI.label}_delta_theta_arr.npy"
-    delta_theta_glitches= np.load(delta_theta_arr_file)
-    '''Let's do something funky: resample the glitch-induced biases and add them to the noise-induced biases'''
-    #Resample the glitch biases
-    resampled_delta_theta_glitches = resample(delta_theta_glitches, n_samples=delta_theta_noise.shape[0], random_state=seed)
-    #Calculate total error across all parameters
-    delta_theta_total= resampled_delta_theta_glitches + delta_theta_noise
-    #Calculate_total_precision
-    total_precision = np.std(delta_theta_total, axis=0)
-    normalised_total_precision= total_precision/SD_ii
-    x_coords = np.arange(0,len(normalised_total_precision))
-    #Scatter plot the params
-    plt.scatter(x_coords, normalised_total_precision, marker=".", label=f"Glitch SNRs $\\leq$ {SNR}", zorder=2)
-
-plt.xticks(x_coords, param_labels)
-plt.grid(axis="x", zorder=1)
-plt.legend()
-plt.ylabel("$SD(\Delta \\theta_{\\text{total}})$ / $SD(\Delta \\theta_{\\text{noise}})$")
-plt.xlabel("Parameter")
-plt.savefig(f"{fiducial_EMRI.label}_total_precisions.pdf")
\ No newline at end of file
+#Max glitch SNRs for the continuous curves (only made when per-glitch bias contributions are stored)
+threshold_grid = np.logspace(0, 4, 200)
+
+
+def main(fiducial_EMRI=fiducial_EMRI, max_glitch_SNR=max_glitch_SNR, processes=None, output_path=None):
+    plt = pyplot()
+    #Load FM-derived noise-induced SDs (cached with the noise covariance)
+    noise_model = load_noise_model(fiducial_EMRI.label)
+    SD_ii = noise_model.SD_ii
+
+    #Iterate plotting of total precisions over various glitch mitigation levels
+    plt.figure()
+    # plt.title(f"{fiducial_EMRI.label}\n Uncertainty ratios for many glitch+noise backgrounds")
+    for SNR in max_glitch_SNR:
+        #Load EMRI biases
+        delta_theta_glitches= load_delta_theta_arr(fiducial_EMRI.label, SNR)
+        '''Glitch and noise biases are independent, so SD(total)/SD(noise) = sqrt(1 + var(glitch biases)/SD_ii^2).
+        Bootstrapping over the glitch backgrounds, each with a fresh noise draw, gives an interval for having only this many of them'''
+        result = bootstrap_total_precision(delta_theta_glitches, SD_ii, noise_model.noise_cholesky, n_boot=n_boot,
+                                           confidence=confidence, seed=seed, processes=processes)
+        normalised_total_precision= result.normalised_total_precision
+        lower, upper = result.interval
+        yerr = np.maximum([normalised_total_precision - lower, upper - normalised_total_precision], 0)
+        x_coords = np.arange(0,len(normalised_total_precision))
+        #Scatter plot the params with their bootstrap intervals
+        plt.errorbar(x_coords, normalised_total_precision, yerr=yerr, fmt=".", capsize=2, label=f"Glitch SNRs $\\leq$ {SNR}", zorder=2)
+
+    plt.xticks(x_coords, param_labels)
+    plt.grid(axis="x", zorder=1)
+    plt.legend()
+    plt.ylabel("$SD(\Delta \\theta_{\\text{total}})$ / $SD(\Delta \\theta_{\\text{noise}})$")
+    plt.xlabel("Parameter")
+    plt.savefig(output_path or outputs(fiducial_EMRI)[0])
+    plt.close()
+
+    #Continuous version: expected total precisions against the max glitch SNR, from the per-glitch bias contributions
+    if has_glitch_contributions(fiducial_EMRI.label):
+        curves = normalised_precision_curve(bias_moments(load_glitch_contributions(fiducial_EMRI.label), threshold_grid), SD_ii)
+        plt.figure()
+        for k in range(curves.shape[1]):
+            plt.plot(threshold_grid, curves[:, k], label=param_labels[k])
+        for SNR in max_glitch_SNR:
+            if np.isfinite(SNR):
+                plt.axvline(SNR, linestyle="--", color="grey", zorder=1)
+        plt.xscale("log")
+        plt.legend(ncol=2, fontsize="small")
+        plt.ylabel("$SD(\Delta \\theta_{\\text{total}})$ / $SD(\Delta \\theta_{\\text{noise}})$")
+        plt.xlabel("Max glitch SNR")
+        plt.savefig(curve_output(output_path or outputs(fiducial_EMRI)[0]))
+        plt.close()
+
+
+def inputs(fiducial_EMRI=fiducial_EMRI, max_glitch_SNR=max_glitch_SNR):
+    #Files read by main(), for run_figures.py
+    files = [fisher_file(fiducial_EMRI.label)] + [delta_theta_arr_file(fiducial_EMRI.label, SNR) for SNR in max_glitch_SNR]
+    if has_glitch_contributions(fiducial_EMRI.label):
+        files += contributions_files(fiducial_EMRI.label)
+    return files
+
+
+def curve_output(path):
+    return path.removesuffix(".pdf") + "_vs_max_SNR.pdf"
+
+
+def outputs(fiducial_EMRI=fiducial_EMRI):
+    path = f"{fiducial_EMRI.label}_total_precisions.pdf"
+    return [path, curve_output(path)] if has_glitch_contributions(fiducial_EMRI.label) else [path]
+
+
+if __name__ == "__main__":
+    main()
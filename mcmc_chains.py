@@ -0,0 +1,134 @@
+"""
+Direct, cached access to eryn HDF5 chain files.
+
+eryn's ``HDFBackend.get_chain()`` reads the whole chain of every branch on
+each call. Here a chain file is opened once, only the post-burn-in steps
+``[discard, iteration)`` of one branch are read, by hyperslab selection
+in blocks of ``block_steps`` steps, and the per-temperature posterior means
+are reduced over (steps, walkers, leaves) in one vectorised sum per block.
+
+Reduced summaries are cached in ``cache/{chain file stem}.{branch}.discard-{discard}.npz``
+next to the chain file, stamped with the chain's size and mtime, so later runs
+do not touch the chain at all.
+
+Layout read (written by eryn.backends.HDFBackend):
+    {group}/                attrs: iteration, ntemps, nwalkers, ...
+    {group}/chain/{branch}  (steps, ntemps, nwalkers, nleaves, ndim)
+    {group}/inds/{branch}   (steps, ntemps, nwalkers, nleaves), optional
+
+Example:
+
+    from mcmc_chains import load_chain_summary
+    summary = load_chain_summary(chain_file, discard=2000)
+    cold_chain_mean = summary.means[0]
+"""
+
+from __future__ import annotations
+
+import os
+import pickle
+from pathlib import Path
+from typing import NamedTuple
+
+import numpy as np
+
+from EMRI_settings import param_names
+
+CACHE_SUBDIR = "cache"
+
+
+class ChainSummary(NamedTuple):
+    means: np.ndarray  # posterior mean per temperature, (ntemps, ndim)
+    n_samples: np.ndarray  # samples averaged per temperature and param, (ntemps, ndim)
+    discard: int
+    iteration: int
+    nwalkers: int
+
+
+def _stamp(path: Path) -> np.ndarray:
+    st = os.stat(path)
+    return np.array([st.st_size, st.st_mtime_ns], dtype=np.int64)
+
+
+def chain_shape(chain_file: str | Path, branch: str = "model_0", group: str = "mcmc") -> tuple[int, ...]:
+    """(iteration, ntemps, nwalkers, nleaves, ndim) of the stored chain, without reading it."""
+    from h5py import File
+
+    with File(chain_file, "r") as f:
+        g = f[group]
+        return (int(g.attrs["iteration"]),) + tuple(g["chain"][branch].shape[1:])
+
+
+def compute_chain_summary(
+    chain_file: str | Path,
+    discard: int,
+    branch: str = "model_0",
+    group: str = "mcmc",
+    block_steps: int = 1000,
+) -> ChainSummary:
+    """Per-temperature means of the steps after ``discard``, read block by block."""
+    from h5py import File
+
+    with File(chain_file, "r") as f:
+        g = f[group]
+        iteration = int(g.attrs["iteration"])
+        chain = g["chain"][branch]
+        inds = g["inds"][branch] if "inds" in g and branch in g["inds"] else None
+        _, ntemps, nwalkers, _, ndim = chain.shape
+        sums = np.zeros((ntemps, ndim))
+        counts = np.zeros((ntemps, ndim))
+        for start in range(discard, iteration, block_steps):
+            stop = min(start + block_steps, iteration)
+            slab = chain[start:stop]
+            if inds is None:
+                sums += slab.sum(axis=(0, 2, 3))
+                counts += slab.shape[0] * slab.shape[2] * slab.shape[3]
+            else:
+                # Leaves switched off in reversible-jump runs do not count
+                active = inds[start:stop][..., None]
+                sums += np.where(active, slab, 0.0).sum(axis=(0, 2, 3))
+                counts += active.sum(axis=(0, 2, 3))
+    with np.errstate(invalid="ignore", divide="ignore"):
+        means = sums/counts
+    return ChainSummary(means=means, n_samples=counts, discard=discard, iteration=iteration, nwalkers=nwalkers)
+
+
+def summary_cache_path(chain_file: str | Path, discard: int, branch: str = "model_0") -> Path:
+    chain_file = Path(chain_file)
+    return chain_file.parent / CACHE_SUBDIR / f"{chain_file.stem}.{branch}.discard-{discard}.npz"
+
+
+def load_chain_summary(
+    chain_file: str | Path,
+    discard: int,
+    branch: str = "model_0",
+    group: str = "mcmc",
+) -> ChainSummary:
+    """Cached ChainSummary; recomputed when the chain file's size or mtime change."""
+    chain_file = Path(chain_file)
+    path = summary_cache_path(chain_file, discard, branch)
+    stamp = _stamp(chain_file)
+    if path.exists():
+        with np.load(path, allow_pickle=False) as npz:
+            if np.array_equal(npz["stamp"], stamp):
+                return ChainSummary(
+                    means=npz["means"],
+                    n_samples=npz["n_samples"],
+                    discard=int(npz["discard"]),
+                    iteration=int(npz["iteration"]),
+                    nwalkers=int(npz["nwalkers"]),
+                )
+    summary = compute_chain_summary(chain_file, discard, branch=branch, group=group)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    with tmp.open("wb") as f:
+        np.savez(f, stamp=stamp, **summary._asdict())
+    os.replace(tmp, path)
+    return summary
+
+
+def load_true_vals(params_file: str | Path) -> np.ndarray:
+    """Injected values of the estimated params, in param_names order, from a pickled ``PARAMS_*`` dict."""
+    with open(params_file, 'rb') as f:
+        params_dict = pickle.load(f)
+    return np.array([params_dict[name] for name in param_names])
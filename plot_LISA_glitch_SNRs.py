@@ -1,36 +1,34 @@
 import numpy as np
-import matplotlib.pyplot as plt
-import h5py
+from plotting import pyplot
+from snr_sketch import accumulate_SNRs, histogram_SNRs
+from catalogues import load_LPF_parameters
+
+plt = pyplot()
 
 
 
 LISA_SNR_file = '/fred/oz303/aboumerd/EMRI_Glitches/Glitch_Code/glitch_SNRs_dset.h5'
+#Processes reading the LISA SNR catalogue
+n_jobs=8
 
-#Load LISA SNRs
-with h5py.File(LISA_SNR_file, "r") as f:
-    LISA_SNRs= f["SNR"][()]
+#Chunked pass over the LISA SNRs: a quantile sketch (relative accuracy 0.5%) for the percentiles
+#instead of the full array, see snr_sketch.py
+LISA_sketch = accumulate_SNRs(LISA_SNR_file, jobs=n_jobs).sketch
 
-#Load LPF SNRs
-ordinary_data = np.loadtxt("/fred/oz303/aboumerd/software/glitch/data/2021-09-17-effective_glitch_parameters_ordinary.txt")
-cold_data = np.loadtxt("/fred/oz303/aboumerd/software/glitch/data/2021-09-17-effective_glitch_parameters_cold.txt")
-data= np.abs(np.concatenate([ordinary_data,cold_data]))
+#Load LPF SNRs, parsed once and then memory-mapped from a binary sidecar, see catalogues.py
+ordinary_data = load_LPF_parameters("/fred/oz303/aboumerd/software/glitch/data/2021-09-17-effective_glitch_parameters_ordinary.txt")
+cold_data = load_LPF_parameters("/fred/oz303/aboumerd/software/glitch/data/2021-09-17-effective_glitch_parameters_cold.txt")
 '''
 The data is ordered as:
 col. 1 := Beta
 col. 2 := Alpha (+ve or -ve)
 col. 3 := SNR
 '''
-LPF_SNRs = data[:,-1]
+LPF_SNRs = np.abs(np.concatenate([ordinary_data["SNR"],cold_data["SNR"]]))
 
 
 #Get some percentiles on the LISA SNRs
-percentiles = {
-    "10th" : np.percentile(LISA_SNRs, 10),
-    "25th" : np.percentile(LISA_SNRs, 25),
-    "50th" : np.percentile(LISA_SNRs, 50),
-    "75th" : np.percentile(LISA_SNRs, 75),
-    "90th" : np.percentile(LISA_SNRs, 90)
-}
+percentiles = dict(zip(["10th", "25th", "50th", "75th", "90th"], LISA_sketch.quantile([0.1, 0.25, 0.5, 0.75, 0.9])))
 
 #Plot histogram of LISA and LPF glitch SNRs
 fig, axs = plt.subplots(2,1, sharex=True)
@@ -40,18 +38,20 @@ no_bins=40
 #imposing limits on the bins since there are outlier SNRs
 '''The LISA SNR has an extremely long tail, and a small number of extreme outliers.
 So restrict the bins to the 1st and 99th percentile'''
-bins_LISA=np.logspace(np.log10(np.percentile(LISA_SNRs,1)), np.log10(np.percentile(LISA_SNRs,99)), num=no_bins)#-2, 4
+bins_LISA=np.logspace(*np.log10(LISA_sketch.quantile([0.01, 0.99])), num=no_bins)#-2, 4
+#Second chunked pass: exact counts on these bins
+LISA_hist = histogram_SNRs(LISA_SNR_file, bins_LISA[0], bins_LISA[-1], n_bins=no_bins-1, jobs=n_jobs)
 bins_LPF= np.logspace(np.log10(LPF_SNRs.min()), np.log10(LPF_SNRs.max()), num=no_bins)#, , np.log10(SNRs.min()), np.log10(SNRs.max()),
 
 # fig.suptitle("SNRs of glitches observed in LPF")
 
-axs[0].hist(LISA_SNRs, bins=bins_LISA, label="Using SciRDv1 PSD {$A_2,E_2$}")
+axs[0].hist(bins_LISA[:-1], bins=bins_LISA, weights=LISA_hist.counts, label="Using SciRDv1 PSD {$A_2,E_2$}")
 # axs[0].hist(LPF_SNRs, bins=bins_LPF, label="Using LPF PSD", alpha=0.5)
 axs[0].set_xscale("log")
 axs[0].set_ylabel("Counts")
 # axs[0].legend()
 
-axs[1].hist(LISA_SNRs, bins=bins_LISA, cumulative=True, density=True, histtype="step")
+axs[1].hist(bins_LISA[:-1], bins=bins_LISA, weights=LISA_hist.counts, cumulative=True, density=True, histtype="step")
 # axs[1].hist(LPF_SNRs, bins=bins_LPF, cumulative=True, density=True, histtype="step", alpha=0.5)
 # axs[1].plot(percentiles["10th"], 0.1 ,"s",label=f"10th percentile = {percentiles['10th']:.2f}" , color= "black")
 # axs[1].plot(percentiles["25th"], 0.25, "p",label=f"25th percentile = {percentiles['25th']:.2f}" , color= "red")
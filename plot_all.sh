@@ -1,20 +1,9 @@
 #!/usr/bin/env bash
 set -u
-shopt -s globstar 2>/dev/null || true
 
+# Runs every *_fig.py in a single interpreter; extra arguments (e.g. --jobs 4)
+# are passed through to run_figures.py.
 PY=python3
 
-# find NUL-separated to match read -d ''
-find . -type f -name '*_fig.py' \
-  -not -path './.venv/*' -not -path './venv/*' -not -path './env/*' \
-  -not -path '*/__pycache__/*' -not -path '*/.git/*' -print0 |
-  while IFS= read -r -d '' file; do
-    echo "==== Running: $file ===="
-    "$PY" "$file"
-    rc=$?
-    echo "Exit code: $rc"
-    if [ $rc -ne 0 ]; then
-      echo "ERROR: $file exited with $rc" >&2
-    fi
-    echo
-  done
+cd "$(dirname "$0")" || exit 1
+exec "$PY" run_figures.py "$@"
@@ -0,0 +1,24 @@
+"""
+Matplotlib access for the figure scripts.
+
+pyplot is imported on first use instead of at module import, so modules that
+only need a figure's inputs() / outputs() (run_figures.py, sweep_figures.py)
+or its data never load matplotlib. The backend defaults to the
+non-interactive Agg, unless MPLBACKEND is set.
+
+Example:
+
+    from plotting import pyplot
+    plt = pyplot()
+"""
+
+import os
+
+
+def pyplot():
+    """matplotlib.pyplot, with the Agg backend unless MPLBACKEND is set."""
+    import matplotlib
+    if "MPLBACKEND" not in os.environ:
+        matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+    return plt
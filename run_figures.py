@@ -0,0 +1,227 @@
+#!/usr/bin/env python3
+"""
+Regenerate the paper figures from every *_fig.py script in one interpreter.
+
+Each figure module is imported once and its main() is called, so numpy,
+matplotlib, h5py etc. are imported once and inputs loaded through EMRI_data
+are shared between figures instead of being re-read by every script.
+
+Figures are only rebuilt when stale. Every figure module declares
+``inputs()`` (the files its main() reads) and ``outputs()`` (the files it
+writes). A figure's digest hashes its module source, the attributes of its
+``fiducial_EMRI``, its ``max_glitch_SNR`` list and the contents of its input
+files. It is skipped when the digest recorded by its last successful run in
+``cache/figure_build.json`` is unchanged, and every output exists and is
+newer than every input. File contents are only re-hashed when a file's size
+or mtime changes. Editing one EMRI in EMRI_settings.py therefore rebuilds
+only that EMRI's figures. Changes to helper modules are not tracked; use
+``--force`` after editing them.
+
+Usage examples:
+
+  - Run all figures in this process:
+      python run_figures.py
+
+  - Spread the figures over 4 worker processes:
+      python run_figures.py --jobs 4
+
+  - Only run some figures:
+      python run_figures.py glitch_biases_fig max_R_CDF_fig
+
+  - Rebuild even if up to date:
+      python run_figures.py --force
+
+Exits non-zero if any figure fails.
+"""
+
+from __future__ import annotations
+
+import argparse
+import hashlib
+import importlib
+import json
+import os
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+ROOT = Path(__file__).resolve().parent
+BUILD_STATE = Path("cache") / "figure_build.json"
+
+
+def find_figure_modules(root: Path = ROOT) -> list[str]:
+    return sorted(p.stem for p in root.glob("*_fig.py"))
+
+
+def run_figure(module_name: str) -> tuple[str, float, Optional[str]]:
+    """Import a figure module and call its main(); returns (name, wall time, traceback or None)."""
+    t0 = time.perf_counter()
+    error = None
+    try:
+        module = importlib.import_module(module_name)
+        module.main()
+    except Exception:
+        error = traceback.format_exc()
+    return module_name, time.perf_counter() - t0, error
+
+
+def _describe(value) -> str:
+    """Stable text form of a figure setting (EMRI objects by their attributes)."""
+    if hasattr(value, "_asdict"):
+        value = value._asdict()
+    elif hasattr(value, "__dict__"):
+        value = vars(value)
+    if isinstance(value, dict):
+        return "{" + ", ".join(f"{k!r}: {_describe(v)}" for k, v in sorted(value.items())) + "}"
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_describe(v) for v in value) + "]"
+    return repr(value)
+
+
+def file_digest(path: str, hashes: dict) -> str:
+    """sha256 of a file's contents, reusing ``hashes[path]`` while its size and mtime are unchanged."""
+    if not os.path.exists(path):
+        return "missing"
+    st = os.stat(path)
+    stamp = [st.st_size, st.st_mtime_ns]
+    known = hashes.get(path)
+    if known is not None and known["stamp"] == stamp:
+        return known["sha256"]
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(2**20), b""):
+            h.update(block)
+    hashes[path] = {"stamp": stamp, "sha256": h.hexdigest()}
+    return hashes[path]["sha256"]
+
+
+FIGURE_SETTINGS = ("fiducial_EMRI", "max_glitch_SNR", "samples_filename", "glitch_bg_idx")
+
+
+def figure_digest(module, hashes: dict, settings: Optional[dict] = None) -> str:
+    """Digest of a figure's source, settings and input files.
+
+    ``settings`` overrides the module-level defaults and is passed on to
+    ``module.inputs()``.
+    """
+    settings = settings or {}
+    h = hashlib.sha256()
+    h.update(Path(module.__file__).read_bytes())
+    for name in FIGURE_SETTINGS:
+        if name in settings or hasattr(module, name):
+            h.update(f"{name}={_describe(settings.get(name, getattr(module, name, None)))}\n".encode())
+    for path in module.inputs(**settings):
+        h.update(f"{path}:{file_digest(path, hashes)}\n".encode())
+    return h.hexdigest()
+
+
+def is_up_to_date(key: str, digest: str, state: dict, inputs: list[str], outputs: list[str]) -> bool:
+    if state["figures"].get(key) != digest:
+        return False
+    if not all(os.path.exists(path) for path in outputs):
+        return False
+    newest_input = max((os.stat(path).st_mtime_ns for path in inputs if os.path.exists(path)), default=0)
+    return all(os.stat(path).st_mtime_ns >= newest_input for path in outputs)
+
+
+def load_build_state(path: Path = BUILD_STATE) -> dict:
+    try:
+        state = json.loads(path.read_text())
+    except (OSError, ValueError):
+        state = {}
+    state.setdefault("figures", {})
+    state.setdefault("file_hashes", {})
+    return state
+
+
+def save_build_state(state: dict, path: Path = BUILD_STATE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(state, indent=1, sort_keys=True))
+    os.replace(tmp, path)
+
+
+def run_figure_batch(module_names: list[str]) -> list[tuple[str, float, Optional[str]]]:
+    return [run_figure(name) for name in module_names]
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument(
+        "figures",
+        nargs="*",
+        help="Figure modules to run, e.g. glitch_biases_fig (default: every *_fig.py)",
+    )
+    p.add_argument(
+        "--jobs",
+        type=int,
+        default=1,
+        help="Number of worker processes; 1 runs everything in this process (default: 1)",
+    )
+    p.add_argument("--force", action="store_true", help="Rebuild figures even if they are up to date")
+    args = p.parse_args()
+
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    requested = [Path(f).stem for f in args.figures] or find_figure_modules()
+    if not requested:
+        raise SystemExit(f"No *_fig.py scripts found in {ROOT}")
+
+    t0 = time.perf_counter()
+    state = load_build_state()
+    digests = {}
+    figures = []
+    for name in requested:
+        try:
+            module = importlib.import_module(name)
+            digests[name] = figure_digest(module, state["file_hashes"])
+            if not args.force and is_up_to_date(name, digests[name], state, module.inputs(), module.outputs()):
+                print(f"{name:<32s}    up to date")
+                continue
+        except Exception:
+            #Let run_figure report the error
+            pass
+        figures.append(name)
+
+    results = []
+    if args.jobs <= 1:
+        for name in figures:
+            results.append(run_figure(name))
+            _report(*results[-1])
+    else:
+        # Deal figures round-robin so every worker imports its modules once and
+        # shares its cached inputs between the figures it runs.
+        batches = [figures[k::args.jobs] for k in range(min(args.jobs, len(figures)))]
+        with ProcessPoolExecutor(max_workers=len(batches)) as pool:
+            for batch_results in pool.map(run_figure_batch, batches):
+                for result in batch_results:
+                    results.append(result)
+                    _report(*result)
+
+    for name, _, error in results:
+        if error is None and name in digests:
+            state["figures"][name] = digests[name]
+        else:
+            state["figures"].pop(name, None)
+    save_build_state(state)
+
+    failed = [name for name, _, error in results if error is not None]
+    print(f"Ran {len(results)} figure(s) in {time.perf_counter() - t0:.2f} s; "
+          f"{len(requested) - len(figures)} up to date; {len(failed)} failed.")
+    if failed:
+        print("Failed: " + ", ".join(failed), file=sys.stderr)
+        sys.exit(1)
+
+
+def _report(name: str, elapsed: float, error: Optional[str]) -> None:
+    status = "ok" if error is None else "FAILED"
+    print(f"{name:<32s} {elapsed:8.2f} s  {status}")
+    if error is not None:
+        print(error, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,368 @@
+#!/usr/bin/env python3
+"""
+One-pass quantiles and log-binned histograms of glitch SNR catalogues.
+
+The catalogue is read in chunks (an HDF5 dataset, or a text file a block of
+rows at a time) and folded into
+
+  - ``QuantileSketch``, a DDSketch-style sketch: values are counted in
+    logarithmic buckets of ratio gamma = (1 + alpha)/(1 - alpha), so any
+    quantile is returned to within a relative error alpha of a value of that
+    rank, in memory that depends on the dynamic range and not on the number
+    of values (at most ``max_buckets``). Beyond that the lowest buckets are
+    collapsed into the lowest kept one, so every value below the kept range
+    is counted at that bucket's value. Ranks above the collapsed mass stay
+    exact to alpha; ``quantile`` raises for a rank that falls in a bucket
+    holding collapsed mass rather than return a wrong value;
+  - ``LogHistogram``, exact counts on fixed log-spaced bins, with underflow
+    and overflow counts.
+
+Both have ``merge``, so chunks of one catalogue, or several catalogues, can
+be accumulated by separate processes and combined. Every percentile of the
+plot (the reported ones and the 1st/99th bin limits) comes from one sketch
+instead of one full sort each. The plotted counts are exact: once the
+sketch has given the bin limits, ``histogram_SNRs`` fills a LogHistogram on
+those bins in a second chunked pass.
+
+Example:
+
+    from snr_sketch import accumulate_SNRs
+    stats = accumulate_SNRs("glitch_SNRs_dset.h5", jobs=8)
+    p1, p50, p99 = stats.sketch.quantile([0.01, 0.5, 0.99])
+    hist = histogram_SNRs("glitch_SNRs_dset.h5", p1, p99, n_bins=39, jobs=8)
+
+Usage:
+    python snr_sketch.py glitch_SNRs_dset.h5 --jobs 8
+    python snr_sketch.py data_files/LISA_glitch_SNRs.txt --percentiles 1 10 50 90 99
+"""
+
+from __future__ import annotations
+
+import argparse
+import math
+import warnings
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Iterator, NamedTuple, Optional, Sequence
+
+import numpy as np
+
+DEFAULT_CHUNK_SIZE = 1_000_000
+
+
+class QuantileSketch:
+    """Mergeable relative-error quantile sketch of positive values (DDSketch).
+
+    ``collapsed_key`` is the highest bucket index that holds values collapsed
+    from below the kept range (None if nothing was collapsed).
+    """
+
+    def __init__(self, relative_accuracy: float = 0.005, max_buckets: int = 8192, min_value: float = 1e-12):
+        self.relative_accuracy = relative_accuracy
+        self.gamma = (1 + relative_accuracy)/(1 - relative_accuracy)
+        self.max_buckets = max_buckets
+        self.min_value = min_value  # values at or below this are counted as zero
+        self._log_gamma = math.log(self.gamma)
+        self.offset = 0  # bucket index of counts[0]
+        self.counts = np.zeros(0, dtype=np.int64)
+        self.collapsed_key: Optional[int] = None
+        self.zero_count = 0
+        self.count = 0
+        self.sum = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def _key(self) -> tuple:
+        return (self.relative_accuracy, self.max_buckets, self.min_value)
+
+    def _add_counts(self, offset: int, counts: np.ndarray) -> None:
+        if not len(counts):
+            return
+        lo = min(self.offset, offset) if len(self.counts) else offset
+        hi = max(self.offset + len(self.counts), offset + len(counts))
+        if lo != self.offset or hi - lo != len(self.counts):
+            grown = np.zeros(hi - lo, dtype=np.int64)
+            grown[self.offset - lo:self.offset - lo + len(self.counts)] = self.counts
+            self.counts, self.offset = grown, lo
+        self.counts[offset - lo:offset - lo + len(counts)] += counts
+        if len(self.counts) > self.max_buckets:
+            #Collapse the lowest buckets into the lowest kept one. Its values are
+            #then wrong for the collapsed ranks; higher buckets are unaffected
+            excess = len(self.counts) - self.max_buckets
+            self.counts[excess] += self.counts[:excess].sum()
+            self.counts = self.counts[excess:]
+            self.offset += excess
+            self._mark_collapsed(self.offset)
+
+    def _mark_collapsed(self, key: Optional[int]) -> None:
+        if key is not None:
+            self.collapsed_key = key if self.collapsed_key is None else max(self.collapsed_key, key)
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        if not len(values):
+            return
+        self.count += len(values)
+        self.sum += float(values.sum())
+        self.min = min(self.min, float(values.min()))
+        self.max = max(self.max, float(values.max()))
+        positive = values[values > self.min_value]
+        self.zero_count += len(values) - len(positive)
+        if len(positive):
+            keys = np.ceil(np.log(positive)/self._log_gamma).astype(np.int64)
+            offset = int(keys.min())
+            self._add_counts(offset, np.bincount(keys - offset))
+
+    def merge(self, other: QuantileSketch) -> None:
+        if other._key() != self._key():
+            raise ValueError(f"cannot merge sketches with parameters {other._key()} and {self._key()}")
+        self._add_counts(other.offset, other.counts)
+        self._mark_collapsed(other.collapsed_key)
+        self.zero_count += other.zero_count
+        self.count += other.count
+        self.sum += other.sum
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    def bucket_values(self) -> np.ndarray:
+        """Representative value of every bucket, within alpha of all the values it holds."""
+        return 2*self.gamma**np.arange(self.offset, self.offset + len(self.counts))/(self.gamma + 1)
+
+    def quantile(self, q: float | Sequence[float]) -> float | np.ndarray:
+        """np.percentile(..., q*100) up to the relative accuracy: the values of ranks
+        floor and ceil of q (n - 1), linearly interpolated.
+
+        Raises ``ValueError`` if one of these ranks falls in a bucket holding
+        collapsed values (see ``collapsed_key``), where no accuracy holds.
+        """
+        if self.count == 0:
+            raise ValueError("empty sketch")
+        ranks = np.asarray(q, dtype=np.float64)*(self.count - 1)
+        #Buckets in ascending value, the zero bucket first
+        cumulative = np.cumsum(np.concatenate([[self.zero_count], self.counts]))
+        values = np.concatenate([[0.0], self.bucket_values()])
+        lo = np.floor(ranks)
+        buckets = [np.searchsorted(cumulative, rank, side="right") for rank in (lo, np.minimum(lo + 1, self.count - 1))]
+        if self.collapsed_key is not None:
+            #Bucket k of the concatenation (k >= 1) has index offset + k - 1
+            limit = self.collapsed_key - self.offset + 1
+            if any(np.any((b >= 1) & (b <= limit)) for b in buckets):
+                raise ValueError(
+                    f"quantile {q} falls in buckets holding values collapsed below "
+                    f"{self.gamma**self.collapsed_key:.4g}; use a larger max_buckets"
+                )
+        low_value, high_value = (np.clip(values[b], self.min, self.max) for b in buckets)
+        out = low_value + (ranks - lo)*(high_value - low_value)
+        return float(out) if out.ndim == 0 else out
+
+    @property
+    def mean(self) -> float:
+        return self.sum/self.count if self.count else math.nan
+
+
+class LogHistogram:
+    """Counts on fixed log-spaced bins from ``low`` to ``high``, with underflow and overflow."""
+
+    def __init__(self, low: float = 1e-2, high: float = 1e6, n_bins: int = 400):
+        self.edges = np.logspace(np.log10(low), np.log10(high), n_bins + 1)
+        self.counts = np.zeros(n_bins, dtype=np.int64)
+        self.underflow = 0
+        self.overflow = 0
+
+    def add(self, values: np.ndarray) -> None:
+        values = np.asarray(values, dtype=np.float64).ravel()
+        values = values[~np.isnan(values)]
+        below = values < self.edges[0]
+        above = values > self.edges[-1]
+        self.underflow += int(below.sum())
+        self.overflow += int(above.sum())
+        inside = values[~(below | above)]
+        #Right-closed last bin, as np.histogram
+        bins = np.minimum(np.searchsorted(self.edges, inside, side="right") - 1, len(self.counts) - 1)
+        self.counts += np.bincount(bins, minlength=len(self.counts))
+
+    def merge(self, other: LogHistogram) -> None:
+        if not np.array_equal(other.edges, self.edges):
+            raise ValueError("cannot merge histograms with different bins")
+        self.counts += other.counts
+        self.underflow += other.underflow
+        self.overflow += other.overflow
+
+
+class SNRStats(NamedTuple):
+    sketch: QuantileSketch
+    histogram: LogHistogram
+
+    def add(self, values: np.ndarray) -> None:
+        self.sketch.add(values)
+        self.histogram.add(values)
+
+    def merge(self, other: SNRStats) -> None:
+        self.sketch.merge(other.sketch)
+        self.histogram.merge(other.histogram)
+
+
+def new_stats(relative_accuracy: float = 0.005, low: float = 1e-2, high: float = 1e6, n_bins: int = 400) -> SNRStats:
+    return SNRStats(QuantileSketch(relative_accuracy), LogHistogram(low, high, n_bins))
+
+
+def _is_hdf5(path: str | Path) -> bool:
+    return Path(path).suffix in (".h5", ".hdf5")
+
+
+def catalogue_length(path: str | Path, dataset: str = "SNR") -> Optional[int]:
+    """Number of values in an HDF5 catalogue; None for text, whose length is not known before reading."""
+    if not _is_hdf5(path):
+        return None
+    import h5py
+
+    with h5py.File(path, "r") as f:
+        return f[dataset].shape[0]
+
+
+def iter_chunks(
+    path: str | Path,
+    dataset: str = "SNR",
+    column: int = -1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    start: int = 0,
+    stop: Optional[int] = None,
+) -> Iterator[np.ndarray]:
+    """SNRs of a catalogue, ``chunk_size`` values at a time.
+
+    HDF5: rows start:stop of ``dataset``. Text: ``column`` of whitespace-separated
+    rows (comments with #), read a block of rows at a time.
+    """
+    if _is_hdf5(path):
+        import h5py
+
+        with h5py.File(path, "r") as f:
+            dset = f[dataset]
+            stop = dset.shape[0] if stop is None else stop
+            for lo in range(start, stop, chunk_size):
+                yield np.asarray(dset[lo:min(lo + chunk_size, stop)], dtype=np.float64)
+        return
+    with open(path) as f, warnings.catch_warnings():
+        #loadtxt warns when the last block comes back empty
+        warnings.simplefilter("ignore", UserWarning)
+        while True:
+            block = np.loadtxt(f, ndmin=2, max_rows=chunk_size)
+            if not len(block):
+                return
+            yield block[:, column]
+
+
+def _range_tasks(paths: Sequence[str | Path], dataset: str, column: int, chunk_size: int, jobs: int) -> list[tuple]:
+    """(path, dataset, column, chunk_size, start, stop) per task; HDF5 catalogues are split in row ranges."""
+    tasks = []
+    for path in paths:
+        n = catalogue_length(path, dataset)
+        if n is None or jobs <= 1:
+            tasks.append((str(path), dataset, column, chunk_size, 0, None))
+            continue
+        step = max(chunk_size, -(-n // jobs))
+        tasks += [(str(path), dataset, column, chunk_size, lo, min(lo + step, n)) for lo in range(0, n, step)]
+    return tasks
+
+
+def _accumulate_range(path: str, dataset: str, column: int, chunk_size: int, start: int, stop: Optional[int], stats_args: tuple) -> SNRStats:
+    stats = new_stats(*stats_args)
+    for chunk in iter_chunks(path, dataset, column, chunk_size, start, stop):
+        stats.add(chunk)
+    return stats
+
+
+def _histogram_range(path: str, dataset: str, column: int, chunk_size: int, start: int, stop: Optional[int], hist_args: tuple) -> LogHistogram:
+    hist = LogHistogram(*hist_args)
+    for chunk in iter_chunks(path, dataset, column, chunk_size, start, stop):
+        hist.add(chunk)
+    return hist
+
+
+def _run(worker, tasks: list[tuple], jobs: int) -> list:
+    if jobs > 1 and len(tasks) > 1:
+        with ProcessPoolExecutor(max_workers=min(jobs, len(tasks))) as pool:
+            return list(pool.map(worker, *zip(*tasks)))
+    return [worker(*task) for task in tasks]
+
+
+def accumulate_SNRs(
+    paths: str | Path | Sequence[str | Path],
+    dataset: str = "SNR",
+    column: int = -1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    jobs: int = 1,
+    relative_accuracy: float = 0.005,
+    low: float = 1e-2,
+    high: float = 1e6,
+    n_bins: int = 400,
+) -> SNRStats:
+    """One pass over one or more catalogues; HDF5 catalogues are split in row ranges across ``jobs`` processes."""
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    stats_args = (relative_accuracy, low, high, n_bins)
+    tasks = [task + (stats_args,) for task in _range_tasks(paths, dataset, column, chunk_size, jobs)]
+    stats = new_stats(*stats_args)
+    for part in _run(_accumulate_range, tasks, jobs):
+        stats.merge(part)
+    return stats
+
+
+def histogram_SNRs(
+    paths: str | Path | Sequence[str | Path],
+    low: float,
+    high: float,
+    n_bins: int,
+    dataset: str = "SNR",
+    column: int = -1,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+    jobs: int = 1,
+) -> LogHistogram:
+    """Exact counts on ``n_bins`` log bins from ``low`` to ``high``, in one chunked pass.
+
+    Use it for bins that depend on the data, e.g. between quantiles from a
+    first ``accumulate_SNRs`` pass.
+    """
+    if isinstance(paths, (str, Path)):
+        paths = [paths]
+    hist_args = (low, high, n_bins)
+    tasks = [task + (hist_args,) for task in _range_tasks(paths, dataset, column, chunk_size, jobs)]
+    hist = LogHistogram(*hist_args)
+    for part in _run(_histogram_range, tasks, jobs):
+        hist.merge(part)
+    return hist
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("paths", nargs="+", type=Path, help="SNR catalogues (.h5 with an SNR dataset, or text)")
+    p.add_argument("--dataset", default="SNR", help="HDF5 dataset (default: SNR)")
+    p.add_argument("--column", type=int, default=-1, help="Text column holding the SNR (default: last)")
+    p.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help=f"Values per read (default: {DEFAULT_CHUNK_SIZE})")
+    p.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    p.add_argument("--relative-accuracy", type=float, default=0.005, help="Quantile relative accuracy (default: 0.005)")
+    p.add_argument("--percentiles", nargs="+", type=float, default=[1, 10, 25, 50, 75, 90, 99])
+    p.add_argument("--check", action="store_true", help="Also load everything and compare with np.percentile")
+    args = p.parse_args()
+
+    stats = accumulate_SNRs(args.paths, args.dataset, args.column, args.chunk_size, args.jobs, args.relative_accuracy)
+    sketch = stats.sketch
+    print(f"{sketch.count} SNRs, min {sketch.min:.4g}, mean {sketch.mean:.4g}, max {sketch.max:.4g}")
+    quantiles = sketch.quantile(np.asarray(args.percentiles)/100)
+    exact = None
+    if args.check:
+        values = np.concatenate([chunk for path in args.paths for chunk in iter_chunks(path, args.dataset, args.column)])
+        exact = np.percentile(values, args.percentiles)
+    for k, (pct, value) in enumerate(zip(args.percentiles, quantiles)):
+        line = f"  {pct:5g}th percentile {value:.6g}"
+        if exact is not None:
+            line += f"  (np.percentile {exact[k]:.6g}, relative difference {abs(value/exact[k] - 1):.2g})"
+        print(line)
+    hist = stats.histogram
+    decades = np.log10(hist.edges[[0, -1]])
+    print(f"  log histogram {10**decades[0]:g}..{10**decades[1]:g}: underflow {hist.underflow}, overflow {hist.overflow}")
+
+
+if __name__ == "__main__":
+    main()
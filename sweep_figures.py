@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+"""
+Make every figure for every EMRI and set of max glitch SNR cuts.
+
+The sweep is the cross-product of
+  - EMRIs registered in EMRI_settings.py (default: all of them),
+  - sets of max glitch SNR cuts, each plotted together in one figure
+    (default: one set, inf,400,90,8),
+  - figure scripts whose main() takes a fiducial_EMRI (default: all of them).
+
+Work is grouped by EMRI and spread over a process pool, so each worker loads
+an EMRI's Fisher matrix, noise model and error arrays once (through
+EMRI_data's per-process cache) for all the figures it makes. Outputs go to
+
+    {out_dir}/{EMRI label}/max_glitch_SNR_{cut}-{cut}-.../{figure}.pdf
+
+e.g. figures/Prograde_EMRI/max_glitch_SNR_inf-400.0-90.0-8.0/glitch_biases.pdf.
+As in run_figures.py, a figure whose inputs and settings are unchanged since
+its last successful build is skipped unless --force is given.
+
+Usage:
+    python sweep_figures.py --jobs 6
+    python sweep_figures.py --emri Prograde_EMRI Retrograde_EMRI --cuts inf,8 inf,400,90,8
+    python sweep_figures.py --figures glitch_biases_fig max_R_CDF_fig --out-dir revision_figures
+"""
+
+from __future__ import annotations
+
+import argparse
+import importlib
+import inspect
+import sys
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import NamedTuple, Optional
+
+from EMRI_settings import EMRI_registry, get_EMRI
+from run_figures import (
+    ROOT,
+    figure_digest,
+    find_figure_modules,
+    is_up_to_date,
+    load_build_state,
+    save_build_state,
+)
+
+default_cuts = "inf,400,90,8"
+
+
+class SweepTask(NamedTuple):
+    EMRI_label: str
+    max_glitch_SNR: tuple[float, ...]
+    figure: str
+    output_path: str
+
+
+def resolve_EMRI_label(name: str) -> str:
+    """Registered label for ``name``; the constructor-style names (ProgradeEMRI) are accepted as aliases."""
+    if name in EMRI_registry:
+        return name
+    aliases = {label.replace("_", ""): label for label in EMRI_registry}
+    if name in aliases:
+        return aliases[name]
+    raise SystemExit(f"Unknown EMRI {name!r}; registered: {', '.join(EMRI_registry)}")
+
+
+def sweepable_figures() -> list[str]:
+    """Figure modules whose main() takes a fiducial_EMRI and a max_glitch_SNR list."""
+    figures = []
+    for name in find_figure_modules():
+        try:
+            parameters = inspect.signature(importlib.import_module(name).main).parameters
+        except Exception:
+            continue
+        if {"fiducial_EMRI", "max_glitch_SNR", "output_path"} <= set(parameters):
+            figures.append(name)
+    return figures
+
+
+def parse_cuts(text: str) -> tuple[float, ...]:
+    return tuple(float(c) for c in text.split(","))
+
+
+def output_path(out_dir: Path, label: str, cuts: tuple[float, ...], figure: str) -> Path:
+    cuts_dir = "max_glitch_SNR_" + "-".join(str(float(c)) for c in cuts)
+    return out_dir / label / cuts_dir / f"{figure.removesuffix('_fig')}.pdf"
+
+
+def _settings(task: SweepTask) -> dict:
+    return {"fiducial_EMRI": get_EMRI(task.EMRI_label), "max_glitch_SNR": list(task.max_glitch_SNR)}
+
+
+def run_task(task: SweepTask) -> tuple[SweepTask, float, Optional[str]]:
+    t0 = time.perf_counter()
+    error = None
+    try:
+        Path(task.output_path).parent.mkdir(parents=True, exist_ok=True)
+        importlib.import_module(task.figure).main(output_path=task.output_path, **_settings(task))
+    except Exception:
+        error = traceback.format_exc()
+    return task, time.perf_counter() - t0, error
+
+
+def run_task_batch(tasks: list[SweepTask]) -> list[tuple[SweepTask, float, Optional[str]]]:
+    return [run_task(task) for task in tasks]
+
+
+def batch_by_EMRI(tasks: list[SweepTask], jobs: int) -> list[list[SweepTask]]:
+    """Split tasks into per-EMRI batches, each EMRI over about jobs / n_EMRI batches."""
+    by_EMRI: dict[str, list[SweepTask]] = {}
+    for task in tasks:
+        by_EMRI.setdefault(task.EMRI_label, []).append(task)
+    per_EMRI = max(1, jobs // max(1, len(by_EMRI)))
+    batches = []
+    for EMRI_tasks in by_EMRI.values():
+        batches += [EMRI_tasks[k::per_EMRI] for k in range(min(per_EMRI, len(EMRI_tasks)))]
+    return batches
+
+
+def main() -> None:
+    p = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawTextHelpFormatter)
+    p.add_argument("--emri", nargs="+", help="EMRI labels registered in EMRI_settings.py, e.g. Prograde_EMRI (default: all)")
+    p.add_argument(
+        "--cuts",
+        nargs="+",
+        type=parse_cuts,
+        default=[parse_cuts(default_cuts)],
+        help=f"Comma-separated sets of max glitch SNR cuts, one figure per set (default: {default_cuts})",
+    )
+    p.add_argument("--figures", nargs="+", help="Figure modules (default: every one that takes a fiducial_EMRI)")
+    p.add_argument("--out-dir", type=Path, default=Path("figures"), help="Output root (default: figures)")
+    p.add_argument("--jobs", type=int, default=1, help="Worker processes (default: 1)")
+    p.add_argument("--force", action="store_true", help="Rebuild figures even if they are up to date")
+    args = p.parse_args()
+
+    if str(ROOT) not in sys.path:
+        sys.path.insert(0, str(ROOT))
+    EMRIs = [resolve_EMRI_label(name) for name in args.emri] if args.emri else list(EMRI_registry)
+    figures = [Path(f).stem for f in args.figures] if args.figures else sweepable_figures()
+    tasks = []
+    for label in EMRIs:
+        for cuts in args.cuts:
+            for figure in figures:
+                tasks.append(SweepTask(label, cuts, figure, str(output_path(args.out_dir, label, cuts, figure))))
+
+    t0 = time.perf_counter()
+    state = load_build_state()
+    digests = {}
+    stale = []
+    for task in tasks:
+        module = importlib.import_module(task.figure)
+        settings = _settings(task)
+        digests[task.output_path] = figure_digest(module, state["file_hashes"], settings)
+        if not args.force and is_up_to_date(task.output_path, digests[task.output_path], state,
+                                            module.inputs(**settings), [task.output_path]):
+            continue
+        stale.append(task)
+    print(f"{len(tasks)} figure(s) in the sweep, {len(stale)} to make")
+
+    results = []
+    if args.jobs <= 1:
+        for task in stale:
+            results.append(run_task(task))
+            _report(*results[-1])
+    else:
+        batches = batch_by_EMRI(stale, args.jobs)
+        with ProcessPoolExecutor(max_workers=min(args.jobs, max(1, len(batches)))) as pool:
+            for batch_results in pool.map(run_task_batch, batches):
+                for result in batch_results:
+                    results.append(result)
+                    _report(*result)
+
+    for task, _, error in results:
+        if error is None:
+            state["figures"][task.output_path] = digests[task.output_path]
+        else:
+            state["figures"].pop(task.output_path, None)
+    save_build_state(state)
+
+    failed = [task for task, _, error in results if error is not None]
+    print(f"Made {len(results) - len(failed)} figure(s) in {time.perf_counter() - t0:.2f} s; {len(failed)} failed.")
+    if failed:
+        sys.exit(1)
+
+
+def _report(task: SweepTask, elapsed: float, error: Optional[str]) -> None:
+    status = "ok" if error is None else "FAILED"
+    print(f"{task.output_path:<72s} {elapsed:8.2f} s  {status}")
+    if error is not None:
+        print(error, file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Streamed against direct inner products on band-limited PSDs (python -m pytest test_AET_inner_product.py)."""
+
+import numpy as np
+import pytest
+
+from AET_inner_product import DEFAULT_FILTER_TOLERANCE, SciRDv1_PSD, optimal_SNR, streamed_inner_product
+
+DT = 5.0
+N = 2**21
+
+
+def glitch(f0: float = 3e-3, width: float = 300.0) -> np.ndarray:
+    """A/E sine-Gaussian centred in the series, shape (2, N)."""
+    t = (np.arange(N) - N//2)*DT
+    g = 1e-20*np.exp(-0.5*(t/width)**2)*np.sin(2*np.pi*f0*t)
+    return np.stack([g, 0.7*g])
+
+
+def streamed_SNR(h: np.ndarray, **kwargs) -> float:
+    return float(np.sqrt(streamed_inner_product(list(h), list(h), DT, **kwargs)))
+
+
+@pytest.mark.parametrize("f0, width", [(3e-3, 300.0), (1e-3, 2000.0), (1.5e-2, 50.0)])
+def test_streamed_matches_direct_SciRDv1(f0, width):
+    h = glitch(f0, width)
+    assert streamed_SNR(h) == pytest.approx(optimal_SNR(h, DT), rel=DEFAULT_FILTER_TOLERANCE)
+
+
+def test_streamed_matches_direct_table_PSD(tmp_path):
+    #A table covering 1e-4..2e-2 Hz band-limits the weights by itself
+    f = np.logspace(-4, np.log10(2e-2), 400)
+    table = np.column_stack([f] + [SciRDv1_PSD(f, ch) for ch in ("A", "E", "T")])
+    path = tmp_path/"psd.npy"
+    np.save(path, table)
+    h = glitch()
+    kwargs = dict(psd=str(path), f_min=0.0, f_max=None)
+    assert streamed_SNR(h, **kwargs) == pytest.approx(optimal_SNR(h, DT, **kwargs), rel=DEFAULT_FILTER_TOLERANCE)
+
+
+def test_short_filter_is_rejected():
+    with pytest.raises(ValueError, match="reproduces the A weights only"):
+        streamed_SNR(glitch(), filter_length=2**13)
+
+
+def test_unphysical_band_is_rejected():
+    with pytest.raises(ValueError, match="no whitening filter"):
+        streamed_SNR(glitch(), channels=("A", "E", "T"), f_min=0.0, f_max=None)